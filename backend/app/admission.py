@@ -0,0 +1,129 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.metrics import metrics
+
+
+class Overloaded(HTTPException):
+    """Rejected before doing any work, the client should retry later."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(
+            status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class RateLimiter:
+    """Token bucket per key: `per_minute` requests, refilled continuously."""
+
+    def __init__(self, per_minute: int, max_keys: int = 10_000):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def acquire(self, key: str) -> float:
+        """Take a token, returning 0 or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, stamp = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        if len(self._buckets) >= self.max_keys and key not in self._buckets:
+            self._prune(now)
+        self._buckets[key] = (tokens - 1, now)
+        return 0
+
+    def _prune(self, now: float):
+        # Full buckets carry no state, drop them
+        full = now - self.capacity / self.rate
+        self._buckets = {
+            key: value for key, value in self._buckets.items() if value[1] > full
+        }
+
+
+class Limiter:
+    """Concurrency limit with a bounded wait queue for one expensive endpoint.
+
+    Limits are per process, so the totals scale with the number of workers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        queue_size: int,
+        max_wait: float,
+        per_minute: int = 0,
+    ):
+        self.name = name
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.rate_limiter = RateLimiter(per_minute) if per_minute else None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._running = 0
+        self._waiting = 0
+
+        metrics.gauge(f"admission.{name}.running", lambda: self._running)
+        metrics.gauge(f"admission.{name}.waiting", lambda: self._waiting)
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: float):
+        metrics.inc(f"admission.{self.name}.{reason}")
+        raise Overloaded(status_code, detail, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, key: str):
+        if self.rate_limiter:
+            retry_after = self.rate_limiter.acquire(key)
+            if retry_after:
+                self._reject("rate_limited", 429, "Too many requests", retry_after)
+
+        if self._semaphore.locked() and self._waiting >= self.queue_size:
+            self._reject("queue_full", 503, "Server is busy", self.max_wait)
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self._reject("timed_out", 503, "Server is busy", self.max_wait)
+        finally:
+            self._waiting -= 1
+
+        metrics.inc(f"admission.{self.name}.admitted")
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+
+limiters = {
+    name: Limiter(
+        name,
+        concurrency,
+        settings.ADMISSION_QUEUE_SIZE.get(name, 0),
+        settings.ADMISSION_MAX_WAIT_SECONDS,
+        settings.RATE_LIMIT_PER_MINUTE.get(name, 0),
+    )
+    for name, concurrency in settings.ADMISSION_CONCURRENCY.items()
+}
+
+
+@asynccontextmanager
+async def admit(name: str, key: str):
+    """Run the block under the named limiter, if one is configured."""
+    limiter = limiters.get(name)
+    if limiter is None:
+        yield
+        return
+    async with limiter.admit(key):
+        yield
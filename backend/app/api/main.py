@@ -1,8 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from app.metrics import metrics
 from app.users.routes import router as users_router
 from app.sudoku.routes import router as boards_router
+from app.stats.routes import router as stats_router
 
 api_router = APIRouter()
 api_router.include_router(users_router, prefix="/users", tags=["users"])
 api_router.include_router(boards_router, prefix="/boards", tags=["boards"])
+api_router.include_router(stats_router, prefix="/stats", tags=["stats"])
+
+
+@api_router.get("/health", tags=["health"])
+async def health(request: Request):
+    return {"status": "ok", "warm": request.app.state.warm}
+
+
+@api_router.get("/metrics", tags=["metrics"])
+async def read_metrics():
+    return metrics.snapshot()
@@ -26,6 +26,64 @@ class Settings(BaseSettings):
     )
     # sudoku
     MAX_GENERATION_TRIES: int = 5
+    GENERATION_BUDGET_SECONDS: float = 10.0  # Wall clock per generated puzzle
+    # Share of the budget for the requested recipe, the rest is the fallback's
+    GENERATION_FIRST_ATTEMPT_SHARE: float = 0.7
+    # Search budget when checking submitted boards, about a second of CPU
+    BOARD_VALIDATION_MAX_NODES: int = 50_000
+    MAX_BATCH_GAMES: int = 64  # games per /boards/batch request
+    SOLVER_ENGINE: str = "sudoq"  # engine for solve, hints and candidates
+
+    # background generation jobs (kept in memory: use sticky routing with workers)
+    # Wall clock per generated puzzle, nobody waits on the request
+    GENERATION_JOB_BUDGET_SECONDS: float = 60.0
+    GENERATION_JOB_TTL_SECONDS: float = 600.0  # finished jobs are kept this long
+    GENERATION_JOB_HEARTBEAT_SECONDS: float = 5.0  # progress interval on the stream
+    GENERATION_JOBS_MAX: int = 1000  # unfinished jobs per process
+
+    # shared puzzle queue (database backed, refilled by any worker)
+    PUZZLE_QUEUE_ENABLED: bool = True
+    PUZZLE_QUEUE_LOW_WATERMARK: int = 2  # refill when fewer puzzles are ready
+    PUZZLE_QUEUE_TARGET: int = 5  # ready puzzles per difficulty after refill
+    PUZZLE_QUEUE_DIFFICULTIES: list[str] = ["easy", "medium", "hard", "expert"]
+
+    # admission control for expensive endpoints (per process)
+    ADMISSION_CONCURRENCY: dict[str, int] = {
+        "singleplayer": 2,
+        "batch": 1,
+        "solve": 4,
+        "hint": 4,
+    }
+    ADMISSION_QUEUE_SIZE: dict[str, int] = {
+        "singleplayer": 8,
+        "batch": 2,
+        "solve": 16,
+        "hint": 16,
+    }
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0  # queued longer than this gets a 503
+    RATE_LIMIT_PER_MINUTE: dict[str, int] = {
+        "singleplayer": 10,
+        "batch": 5,
+        "solve": 30,
+        "hint": 60,
+    }
+
+    # active game cache (per process: use with a single worker or sticky routing)
+    GAME_CACHE_ENABLED: bool = False
+    GAME_CACHE_MAX_SIZE: int = 1000
+    GAME_CACHE_FLUSH_INTERVAL: float = 5.0  # seconds between write-behind flushes
+    GAME_CACHE_WRITE_THROUGH: bool = False  # commit every move, cache only reads
+
+    # archival of finished and idle games (runs in every worker)
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_IDLE_DAYS: int = 30  # unsolved games untouched this long are archived
+    ARCHIVE_BATCH_SIZE: int = 500  # games moved per transaction
+    ARCHIVE_INTERVAL_SECONDS: float = 300.0  # pause between archival runs
+    ARCHIVE_BATCH_PAUSE_SECONDS: float = 0.5  # pause between batches of one run
+
+    # bulk export / import
+    EXPORT_BATCH_SIZE: int = 1000
+    IMPORT_BATCH_SIZE: int = 1000
 
     # deployment
     API_V1_STR: str = "/api/v1"
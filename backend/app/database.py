@@ -1,3 +1,4 @@
+from sqlalchemy import Column, Integer, Table, inspect, select, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
@@ -15,9 +16,82 @@ AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=F
 
 Base = declarative_base()
 
+# Bump SCHEMA_VERSION with every schema change. New tables are created by
+# create_all, changes to existing tables go into MIGRATIONS under the version
+# that introduces them, as SQL or as a function of the connection.
+SCHEMA_VERSION = 7
+
+
+def _backfill_user_stats(sync_conn):
+    from app.stats.service import game_deltas, merge_deltas, upsert_statement
+
+    result = sync_conn.execution_options(yield_per=settings.EXPORT_BATCH_SIZE).execute(
+        select(Base.metadata.tables["sudoku_games"])
+    )
+    rows = merge_deltas(d for row in result.mappings() for d in game_deltas(row))
+    if rows:
+        sync_conn.execute(upsert_statement(sync_conn.dialect.name), rows)
+
+
+def _autoincrement_game_ids(sync_conn):
+    # SQLite can only add AUTOINCREMENT by rebuilding the table. Postgres
+    # sequences never reuse ids.
+    if sync_conn.dialect.name != "sqlite":
+        return
+    games = Base.metadata.tables["sudoku_games"]
+    inspector = inspect(sync_conn)
+    old_columns = {c["name"] for c in inspector.get_columns("sudoku_games")}
+    columns = ", ".join(c.name for c in games.columns if c.name in old_columns)
+    for index in inspector.get_indexes("sudoku_games"):
+        sync_conn.execute(text(f"DROP INDEX {index['name']}"))
+    sync_conn.execute(text("ALTER TABLE sudoku_games RENAME TO sudoku_games_old"))
+    games.create(sync_conn)
+    sync_conn.execute(
+        text(
+            f"INSERT INTO sudoku_games ({columns}) "
+            f"SELECT {columns} FROM sudoku_games_old"
+        )
+    )
+    sync_conn.execute(text("DROP TABLE sudoku_games_old"))
+    # Ids of games archived before this migration are not handed out again
+    sync_conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'sudoku_games'"))
+    sync_conn.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'sudoku_games', "
+            "MAX(COALESCE((SELECT MAX(id) FROM sudoku_games), 0), "
+            "COALESCE((SELECT MAX(id) FROM sudoku_games_archive), 0))"
+        )
+    )
+
+
+MIGRATIONS = {
+    2: [
+        "ALTER TABLE sudoku_games ADD COLUMN puzzle_id INTEGER REFERENCES puzzles(id)",
+        "CREATE INDEX ix_sudoku_games_puzzle_id ON sudoku_games (puzzle_id)",
+    ],
+    4: [_backfill_user_stats],
+    6: [_autoincrement_game_ids],
+    # The version 6 rebuild already creates it on SQLite
+    7: [
+        "CREATE INDEX IF NOT EXISTS ix_sudoku_games_updated_at "
+        "ON sudoku_games (updated_at)"
+    ],
+}
+
+schema_version = Table(
+    "schema_version", Base.metadata, Column("version", Integer, nullable=False)
+)
+
 
 # Import models to register them
-from app.db import User, SudokuGame  # ignore: F401
+from app.db import (  # ignore: F401
+    User,
+    Puzzle,
+    QueuedPuzzle,
+    SudokuGame,
+    ArchivedGame,
+    UserStats,
+)
 
 
 # Dependency for FastAPI
@@ -26,7 +100,57 @@ async def get_db():
         yield session
 
 
-# Function to create all tables
-async def create_tables():
+def _detect_unversioned_schema(sync_conn) -> int:
+    # Databases created by create_all before the schema was versioned
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("sudoku_games"):
+        return 0
+    columns = {c["name"] for c in inspector.get_columns("sudoku_games")}
+    return 2 if "puzzle_id" in columns else 1
+
+
+def _read_schema_version(sync_conn) -> int:
+    if not inspect(sync_conn).has_table("schema_version"):
+        return _detect_unversioned_schema(sync_conn)
+    return sync_conn.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def _upgrade_schema(sync_conn, current: int):
+    Base.metadata.create_all(sync_conn)
+    if current:
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS.get(version, []):
+                if callable(statement):
+                    statement(sync_conn)
+                else:
+                    sync_conn.execute(text(statement))
+    sync_conn.execute(schema_version.delete())
+    sync_conn.execute(schema_version.insert().values(version=SCHEMA_VERSION))
+
+
+# Create or upgrade the schema, a single version lookup when it is current
+async def check_schema():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            # Serialize upgrades when several workers boot at once
+            await conn.execute(text("SELECT pg_advisory_xact_lock(20240001)"))
+        current = await conn.run_sync(_read_schema_version)
+        if current == SCHEMA_VERSION:
+            return
+        if current > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema version {current} is newer than {SCHEMA_VERSION}"
+            )
+        await conn.run_sync(_upgrade_schema, current)
+
+
+# Explicit ids do not advance Postgres sequences, so bump them after bulk imports
+async def sync_id_sequence(session: AsyncSession, table_name: str):
+    if session.bind.dialect.name != "postgresql":
+        return
+    await session.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table_name}), 1))"
+        )
+    )
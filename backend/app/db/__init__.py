@@ -1,5 +1,13 @@
 # Import all models to register them with SQLAlchemy
 from app.users.models import User
-from app.sudoku.models import SudokuGame
+from app.sudoku.models import ArchivedGame, Puzzle, QueuedPuzzle, SudokuGame
+from app.stats.models import UserStats
 
-__all__ = ["User", "SudokuGame"]
+__all__ = [
+    "User",
+    "Puzzle",
+    "QueuedPuzzle",
+    "SudokuGame",
+    "ArchivedGame",
+    "UserStats",
+]
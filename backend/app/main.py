@@ -1,3 +1,5 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -8,13 +10,53 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.config import settings
-from app.database import create_tables
+from app.database import check_schema
+from app.sudoku import core
+from app.sudoku.archive import game_archiver
+from app.sudoku.cache import game_cache
+from app.sudoku.engines import get_engine
+from app.sudoku.generation import start_forkserver
+from app.sudoku.jobs import generation_jobs
+from app.sudoku.queue import puzzle_queue
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI):
+    # Load sudoq and start the generation forkserver after startup completes,
+    # so health checks pass while the heavy imports happen. The puzzle queue
+    # is topped up once generation is ready
+    try:
+        await asyncio.to_thread(core.warm_up)
+        await asyncio.to_thread(start_forkserver)
+        app.state.warm = True
+        if puzzle_queue:
+            puzzle_queue.refill_all()
+    except Exception:
+        logger.exception("Warm-up failed, sudoku modules load on first use")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_tables()
+    await check_schema()
+    get_engine()  # Fail fast on an unknown SOLVER_ENGINE
+    app.state.warm = False
+    # Kept on app.state so benchmarks can await it
+    app.state.warm_up_task = asyncio.create_task(warm_up(app))
+    if game_cache:
+        game_cache.start()
+    if game_archiver:
+        game_archiver.start()
     yield
+    if game_archiver:
+        await game_archiver.stop()
+    app.state.warm_up_task.cancel()
+    await generation_jobs.stop()
+    if puzzle_queue:
+        await puzzle_queue.stop()
+    if game_cache:
+        # Write back every dirty game before the process exits
+        await game_cache.stop()
 
 
 app = FastAPI(
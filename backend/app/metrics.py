@@ -0,0 +1,24 @@
+from collections import defaultdict
+from typing import Callable, Dict
+
+
+class Metrics:
+    """In-process counters and gauges, exposed at /metrics."""
+
+    def __init__(self):
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1):
+        self._counters[name] += value
+
+    def gauge(self, name: str, fn: Callable[[], float]):
+        self._gauges[name] = fn
+
+    def snapshot(self) -> Dict[str, float]:
+        values = dict(self._counters)
+        values.update({name: fn() for name, fn in self._gauges.items()})
+        return dict(sorted(values.items()))
+
+
+metrics = Metrics()
@@ -0,0 +1,85 @@
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Tuple,
+    Type,
+)
+
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import sync_id_sequence
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def dump_lines(models: Iterable[BaseModel]) -> bytes:
+    """Serialize models as newline-delimited JSON."""
+    return b"".join(model.model_dump_json().encode() + b"\n" for model in models)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a byte stream into (line number, line), skipping blank lines."""
+    buffer = b""
+    lineno = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            lineno += 1
+            if line.strip():
+                yield lineno, line
+    if buffer.strip():
+        yield lineno + 1, buffer
+
+
+async def import_lines(
+    db: AsyncSession,
+    lines: AsyncIterable[Tuple[int, bytes]],
+    model: Type[BaseModel],
+    to_row: Callable[[BaseModel], dict],
+    insert_rows: Callable[[List[dict]], Awaitable],
+    table_name: str,
+    keep_ids: bool = False,
+) -> int:
+    """Validate lines as `model` and insert them, all or nothing.
+
+    `to_row` turns a record into column values and raises ValueError to
+    reject it. Rows go to `insert_rows` in multi-row batches and are
+    committed once at the end; any failure rolls the whole import back.
+    """
+    imported = 0
+    batch = []
+    try:
+        async for lineno, line in lines:
+            try:
+                # Pydantic's ValidationError is a ValueError too
+                row = to_row(model.model_validate_json(line))
+            except ValueError as e:
+                raise ValueError(f"Line {lineno}: {e}")
+            if not keep_ids:
+                row.pop("id", None)
+            batch.append(row)
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await insert_rows(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            await insert_rows(batch)
+            imported += len(batch)
+        if keep_ids:
+            await sync_id_sequence(db, table_name)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise ValueError(f"Import failed: {e.orig}")
+    except ValueError:
+        await db.rollback()
+        raise
+    return imported
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.metrics import metrics
+
+
+class SingleFlight:
+    """Run one computation per key at a time, sharing its result with every
+    caller that asks for the same key while it is in flight.
+
+    Per process, like the metrics it reports.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+
+    async def do(
+        self, operation: str, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        call_key = (operation, key)
+        future = self._calls.get(call_key)
+        if future is None:
+            metrics.inc(f"singleflight.{operation}.calls")
+            future = asyncio.ensure_future(fn())
+            self._calls[call_key] = future
+            future.add_done_callback(lambda f: self._done(call_key, f))
+        else:
+            metrics.inc(f"singleflight.{operation}.coalesced")
+        # A caller that goes away must not cancel the work for the others
+        return await asyncio.shield(future)
+
+    def _done(self, call_key: Tuple[str, Hashable], future: asyncio.Future):
+        self._calls.pop(call_key, None)
+        if not future.cancelled():
+            future.exception()  # Retrieved even when every caller has left
+
+
+single_flight = SingleFlight()
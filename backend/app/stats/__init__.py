@@ -0,0 +1 @@
+# Stats module
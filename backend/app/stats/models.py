@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    difficulty = Column(String, primary_key=True)  # "custom" when unknown
+    games_played = Column(Integer, nullable=False, default=0)
+    games_solved = Column(Integer, nullable=False, default=0)
+    mistakes = Column(Integer, nullable=False, default=0)
+    moves = Column(Integer, nullable=False, default=0)
+    solve_seconds_total = Column(Float, nullable=False, default=0)
+    best_solve_seconds = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    # Leaderboards read these in index order
+    __table_args__ = (
+        Index("ix_user_stats_difficulty_solved", "difficulty", "games_solved"),
+        Index("ix_user_stats_difficulty_best", "difficulty", "best_solve_seconds"),
+    )
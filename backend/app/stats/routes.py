@@ -0,0 +1,31 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.stats.schemas import LeaderboardEntry, UserStats
+from app.stats.service import LeaderboardOrder, StatsService
+
+router = APIRouter()
+
+
+def get_stats_service(db: AsyncSession = Depends(get_db)) -> StatsService:
+    # Dependency injection for StatsService
+    return StatsService(db)
+
+
+@router.get("/users/{user_id}", response_model=List[UserStats])
+async def read_user_stats(
+    user_id: int, service: StatsService = Depends(get_stats_service)
+):
+    return await service.get_user_stats(user_id)
+
+
+@router.get("/leaderboard/{difficulty}", response_model=List[LeaderboardEntry])
+async def read_leaderboard(
+    difficulty: str,
+    order: LeaderboardOrder = "solved",
+    limit: int = Query(10, ge=1, le=100),
+    service: StatsService = Depends(get_stats_service),
+):
+    return await service.get_leaderboard(difficulty, order, limit)
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, computed_field
+from typing import Optional
+from datetime import datetime
+
+
+class UserStats(BaseModel):
+    user_id: int
+    difficulty: str
+    games_played: int
+    games_solved: int
+    mistakes: int
+    moves: int
+    solve_seconds_total: float
+    best_solve_seconds: Optional[float] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def average_solve_seconds(self) -> Optional[float]:
+        if not self.games_solved:
+            return None
+        return round(self.solve_seconds_total / self.games_solved, 3)
+
+
+class LeaderboardEntry(UserStats):
+    rank: int
+    username: str
@@ -0,0 +1,161 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Literal, Mapping, Optional
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.stats.models import UserStats
+from app.users.models import User
+
+CUSTOM_DIFFICULTY = "custom"
+COUNTERS = ("games_played", "games_solved", "mistakes", "moves", "solve_seconds_total")
+
+LeaderboardOrder = Literal["solved", "fastest"]
+
+
+def stat_delta(user_id: int, difficulty: Optional[str], **values) -> dict:
+    """One row of increments for the user_stats upsert."""
+    delta = dict.fromkeys(COUNTERS, 0)
+    delta.update(
+        user_id=user_id,
+        difficulty=difficulty or CUSTOM_DIFFICULTY,
+        best_solve_seconds=None,
+    )
+    delta.update(values)
+    return delta
+
+
+def solve_deltas(
+    player_ids: Iterable[int],
+    difficulty: Optional[str],
+    created_at: Optional[datetime],
+    solved_at: Optional[datetime] = None,
+) -> List[dict]:
+    """Credit every player of a game that has just been solved."""
+    seconds = None
+    if created_at:
+        solved_at = solved_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        seconds = max(0.0, (solved_at - created_at).total_seconds())
+    return [
+        stat_delta(
+            player_id,
+            difficulty,
+            games_solved=1,
+            solve_seconds_total=seconds or 0,
+            best_solve_seconds=seconds,
+        )
+        for player_id in player_ids
+        if player_id
+    ]
+
+
+def game_deltas(game: Mapping) -> List[dict]:
+    """Everything an existing game contributes, for imports and backfills."""
+    player_ids = (game["player1_id"], game.get("player2_id"))
+    deltas = [
+        stat_delta(
+            player_id,
+            game.get("difficulty"),
+            games_played=1,
+            mistakes=game.get(f"mistakes_p{n}") or 0,
+            moves=game.get(f"valid_moves_p{n}") or 0,
+        )
+        for n, player_id in enumerate(player_ids, start=1)
+        if player_id
+    ]
+    board_state = game["board_state"]
+    if "0" not in board_state and "." not in board_state:
+        # Timed up to the last update for games solved before tracking
+        deltas += solve_deltas(
+            player_ids,
+            game.get("difficulty"),
+            game.get("created_at"),
+            game.get("updated_at"),
+        )
+    return deltas
+
+
+def merge_deltas(deltas: Iterable[dict]) -> List[dict]:
+    # Postgres rejects an upsert touching the same row twice
+    merged = {}
+    for delta in deltas:
+        key = (delta["user_id"], delta["difficulty"])
+        if key not in merged:
+            merged[key] = dict(delta)
+            continue
+        row = merged[key]
+        for column in COUNTERS:
+            row[column] += delta[column]
+        if delta["best_solve_seconds"] is not None and (
+            row["best_solve_seconds"] is None
+            or delta["best_solve_seconds"] < row["best_solve_seconds"]
+        ):
+            row["best_solve_seconds"] = delta["best_solve_seconds"]
+    return list(merged.values())
+
+
+def upsert_statement(dialect_name: str):
+    """Add a batch of deltas to user_stats, inserting missing rows."""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    table = UserStats.__table__
+    stmt = dialect.insert(table)
+    best, new_best = table.c.best_solve_seconds, stmt.excluded.best_solve_seconds
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.difficulty],
+        set_={
+            **{c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+            "best_solve_seconds": case(
+                (best.is_(None), new_best),
+                (new_best < best, new_best),
+                else_=best,
+            ),
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def apply_stats(db: AsyncSession, deltas: Iterable[dict]):
+    """Queue the deltas in the session's transaction, committed by the caller."""
+    rows = merge_deltas(deltas)
+    if rows:
+        await db.execute(upsert_statement(db.bind.dialect.name), rows)
+
+
+class StatsService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_stats(self, user_id: int):
+        result = await self.db.execute(
+            select(UserStats)
+            .where(UserStats.user_id == user_id)
+            .order_by(UserStats.difficulty)
+        )
+        return result.scalars().all()
+
+    async def get_leaderboard(
+        self, difficulty: str, order: LeaderboardOrder = "solved", limit: int = 10
+    ):
+        query = select(UserStats, User.username).join(
+            User, User.id == UserStats.user_id
+        )
+        query = query.where(UserStats.difficulty == difficulty)
+        if order == "fastest":
+            query = query.where(UserStats.best_solve_seconds.is_not(None)).order_by(
+                UserStats.best_solve_seconds, UserStats.user_id
+            )
+        else:
+            query = query.where(UserStats.games_solved > 0).order_by(
+                UserStats.games_solved.desc(), UserStats.user_id
+            )
+        result = await self.db.execute(query.limit(limit))
+        return [
+            {"rank": rank, "username": username, **_stats_dict(stats)}
+            for rank, (stats, username) in enumerate(result.all(), start=1)
+        ]
+
+
+def _stats_dict(stats: UserStats) -> dict:
+    return {c.name: getattr(stats, c.name) for c in UserStats.__table__.columns}
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import metrics
+from app.sudoku.cache import ActiveGameCache, game_cache
+from app.sudoku.encoding import pack_board, unpack_board
+from app.sudoku.models import ArchivedGame, SudokuGame as SudokuGameModel
+
+logger = logging.getLogger(__name__)
+
+# Columns copied unchanged between the live and the archive table
+ARCHIVE_COLUMNS = (
+    "id",
+    "digit_types",
+    "difficulty",
+    "puzzle_id",
+    "player1_id",
+    "player2_id",
+    "mistakes_p1",
+    "mistakes_p2",
+    "valid_moves_p1",
+    "valid_moves_p2",
+    "created_at",
+    "updated_at",
+)
+
+
+def _is_solved(board_state: str) -> bool:
+    return "0" not in board_state and "." not in board_state
+
+
+def archived_row(row: Mapping) -> dict:
+    """A live game row as stored in the archive."""
+    values = {c: row[c] for c in ARCHIVE_COLUMNS}
+    values["board_packed"] = pack_board(row["board_state"])
+    return values
+
+
+def live_row(row: Mapping) -> dict:
+    """An archive row in the shape of a live game row."""
+    values = {c: row[c] for c in ARCHIVE_COLUMNS}
+    values["board_state"] = unpack_board(row["board_packed"])
+    return values
+
+
+async def load_archived(db: AsyncSession, game_id: int) -> Optional[SudokuGameModel]:
+    """The archived game as a transient SudokuGame, not attached to `db`."""
+    result = await db.execute(
+        select(ArchivedGame.__table__).where(ArchivedGame.id == game_id)
+    )
+    row = result.mappings().one_or_none()
+    if row is None:
+        return None
+    metrics.inc("archive.reads")
+    return SudokuGameModel(**live_row(row))
+
+
+async def restore_game(db: AsyncSession, game_id: int) -> bool:
+    """Move an unsolved archived game back to the live table.
+
+    Raises ValueError when a different live game holds the same id.
+    """
+    result = await db.execute(
+        select(ArchivedGame.__table__).where(ArchivedGame.id == game_id)
+    )
+    row = result.mappings().one_or_none()
+    if row is None:
+        return False
+    values = live_row(row)
+    if _is_solved(values["board_state"]):
+        return False
+    # Counts as activity, so the next archival run does not take it back
+    values["updated_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        await db.execute(insert(SudokuGameModel), [values])
+        await db.execute(delete(ArchivedGame).where(ArchivedGame.id == game_id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        # A concurrent restore also removed the archive row; if it is still
+        # there, the id belongs to a different live game
+        result = await db.execute(
+            select(ArchivedGame.id).where(ArchivedGame.id == game_id)
+        )
+        if result.scalar_one_or_none() is not None:
+            logger.error("Archived game %s clashes with a live game id", game_id)
+            raise ValueError("Game could not be restored")
+        return True
+    metrics.inc("archive.restored")
+    return True
+
+
+class GameArchiver:
+    """Moves solved and idle games out of sudoku_games in bounded batches.
+
+    Each batch is one short transaction and continues after the last id the
+    previous batch looked at, so a run reads the table once. Rows locked by a
+    concurrent move or another worker's batch are skipped on Postgres, and
+    games held by the active game cache are left alone.
+    """
+
+    def __init__(self, cache: Optional[ActiveGameCache] = None):
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    async def archive_batch(self, after: int = 0) -> Tuple[int, Optional[int]]:
+        """Archive up to one batch of games with ids above `after`.
+
+        Returns how many games were moved and the id the next batch continues
+        after, or None once the end of the table is reached.
+        """
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            days=settings.ARCHIVE_IDLE_DAYS
+        )
+        games = SudokuGameModel.__table__
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(games)
+                .where(
+                    games.c.id > after,
+                    or_(
+                        ~games.c.board_state.contains("0")
+                        & ~games.c.board_state.contains("."),
+                        games.c.updated_at < cutoff,
+                    ),
+                )
+                .order_by(games.c.id)
+                .limit(settings.ARCHIVE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.mappings().all()
+            if len(rows) < settings.ARCHIVE_BATCH_SIZE:
+                last_id = None
+            else:
+                last_id = rows[-1]["id"]
+            if self.cache:
+                rows = [row for row in rows if not self.cache.holds(row["id"])]
+            if rows:
+                await session.execute(
+                    insert(ArchivedGame), [archived_row(row) for row in rows]
+                )
+                await session.execute(
+                    delete(SudokuGameModel).where(
+                        SudokuGameModel.id.in_([row["id"] for row in rows])
+                    )
+                )
+                await session.commit()
+                metrics.inc("archive.archived", len(rows))
+        return len(rows), last_id
+
+    async def run_once(self) -> int:
+        archived = 0
+        after = 0
+        while True:
+            batch, after = await self.archive_batch(after)
+            archived += batch
+            if after is None:
+                return archived
+            # Leave room for live traffic between batches
+            await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE_SECONDS)
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                metrics.inc("archive.errors")
+                logger.exception("Archiving games failed")
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+game_archiver = GameArchiver(game_cache) if settings.ARCHIVE_ENABLED else None
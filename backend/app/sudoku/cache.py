@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import metrics
+from app.stats.service import apply_stats
+from app.sudoku.models import SudokuGame as SudokuGameModel
+
+logger = logging.getLogger(__name__)
+
+# Columns that change during play and are written back on flush
+FLUSH_COLUMNS = (
+    "board_state",
+    "mistakes_p1",
+    "mistakes_p2",
+    "valid_moves_p1",
+    "valid_moves_p2",
+    "updated_at",
+)
+
+
+class ActiveGameCache:
+    """Bounded LRU of detached game rows with write-behind of play state.
+
+    Dirty games are written back every `flush_interval` seconds, when they are
+    evicted and when `stop` is called at shutdown, together with the user
+    stats deltas of their moves.
+    """
+
+    def __init__(self, max_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._games: OrderedDict[int, SudokuGameModel] = OrderedDict()
+        # game id -> (version, game); the version guards against moves made
+        # while a flush of the same game is in flight
+        self._dirty: Dict[int, Tuple[int, SudokuGameModel]] = {}
+        self._stats: Dict[int, List[dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        metrics.gauge("game_cache.size", lambda: len(self._games))
+        metrics.gauge("game_cache.dirty", lambda: len(self._dirty))
+
+    def get(self, game_id: int) -> Optional[SudokuGameModel]:
+        game = self._games.get(game_id)
+        if game is None and game_id in self._dirty:
+            # Evicted but its flush failed, the dirty copy is still the latest
+            game = self._dirty[game_id][1]
+            self._games[game_id] = game
+        if game is None:
+            metrics.inc("game_cache.misses")
+            return None
+        self._games.move_to_end(game_id)
+        metrics.inc("game_cache.hits")
+        return game
+
+    async def put(self, game: SudokuGameModel) -> SudokuGameModel:
+        """Cache `game` and return it, or the copy already cached for its id.
+
+        A concurrent request may have loaded and cached the same game first;
+        that copy can already hold moves, so it is kept.
+        """
+        cached = self._games.get(game.id)
+        if cached is None and game.id in self._dirty:
+            cached = self._dirty[game.id][1]
+        if cached is not None:
+            game = cached
+        self._games[game.id] = game
+        self._games.move_to_end(game.id)
+        while len(self._games) > self.max_size:
+            game_id, _ = self._games.popitem(last=False)
+            metrics.inc("game_cache.evictions")
+            if game_id in self._dirty:
+                await self.flush([game_id])
+        return game
+
+    def mark_dirty(self, game: SudokuGameModel, stats: Iterable[dict] = ()):
+        game.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        version = self._dirty.get(game.id, (0, None))[0] + 1
+        self._dirty[game.id] = (version, game)
+        self._stats.setdefault(game.id, []).extend(stats)
+
+    def holds(self, game_id: int) -> bool:
+        return game_id in self._games or game_id in self._dirty
+
+    def discard(self, game_id: int):
+        self._games.pop(game_id, None)
+        self._dirty.pop(game_id, None)
+        self._stats.pop(game_id, None)
+
+    async def flush(self, game_ids: Optional[Iterable[int]] = None):
+        ids = self._dirty.keys() if game_ids is None else game_ids
+        # Snapshot synchronously so later moves bump the version instead
+        pending = {
+            game_id: (
+                self._dirty[game_id][0],
+                {c: getattr(self._dirty[game_id][1], c) for c in FLUSH_COLUMNS},
+            )
+            for game_id in list(ids)
+            if game_id in self._dirty
+        }
+        if not pending:
+            return
+        stats = {game_id: self._stats.pop(game_id, []) for game_id in pending}
+
+        try:
+            async with AsyncSessionLocal() as session:
+                for game_id, (_, values) in pending.items():
+                    await session.execute(
+                        update(SudokuGameModel)
+                        .where(SudokuGameModel.id == game_id)
+                        .values(values)
+                    )
+                await apply_stats(session, (d for ds in stats.values() for d in ds))
+                await session.commit()
+        except BaseException:
+            # Keep the deltas for the next attempt, ahead of any newer ones
+            for game_id, deltas in stats.items():
+                self._stats[game_id] = deltas + self._stats.get(game_id, [])
+            raise
+
+        for game_id, (version, _) in pending.items():
+            if self._dirty.get(game_id, (None,))[0] == version:
+                del self._dirty[game_id]
+        metrics.inc("game_cache.flushes")
+        metrics.inc("game_cache.flushed_games", len(pending))
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                metrics.inc("game_cache.flush_errors")
+                logger.exception("Flushing active games failed")
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+game_cache = (
+    ActiveGameCache(settings.GAME_CACHE_MAX_SIZE, settings.GAME_CACHE_FLUSH_INTERVAL)
+    if settings.GAME_CACHE_ENABLED
+    else None
+)
@@ -1,27 +1,35 @@
+import hashlib
+import importlib
 import random
-from typing import Optional, Tuple, Literal, List
+from typing import Optional, Tuple, List
 import copy
-from sudoq import Grid, reducers, Cell
-from sudoq.generators import PuzzleGenerator
-from sudoq.generators.reducers import (
-    GenericReducer,
-    RandomCellReducer,
-    DigitReducer,
-    CompositeReducer,
-    SequentialReducer,
-)
-from sudoq.solvers import BacktrackingSolver
-from sudoq.solvers.strategies import all_strategies
 
-from app.sudoku.schemas import Hint
+from app.sudoku.engines import get_engine, sudoq_strategies
+from app.sudoku.schemas import Difficulty, Hint
+from app.sudoku.solver import BitmaskSolver, parse_board
 from app.config import settings
 
-type Difficulty = Literal["easy", "medium", "hard"]
+# sudoq is imported inside the functions that use it, keeping it off the
+# import path of app startup; warm_up loads it in the background instead
+SUDOQ_MODULES = (
+    "sudoq",
+    "sudoq.generators",
+    "sudoq.generators.reducers",
+    "sudoq.solvers",
+    "sudoq.solvers.strategies",
+)
+
 
-_all_strategies = list(all_strategies)
+def warm_up():
+    """Import the sudoq modules ahead of the first request that needs them."""
+    for module in SUDOQ_MODULES:
+        importlib.import_module(module)
+    sudoq_strategies()
 
 
-def generate_puzzle(difficulty: Difficulty = "medium") -> str:
+def generate_puzzle(
+    difficulty: Difficulty = "medium", tries: Optional[int] = None
+) -> str:
     """Generate a Sudoku puzzle and return as string.
 
     Difficulty controls min_clues:
@@ -30,6 +38,15 @@ def generate_puzzle(difficulty: Difficulty = "medium") -> str:
     - hard: 35-40 clues
     - expert: 25-30 clues
     """
+    from sudoq import reducers
+    from sudoq.generators import PuzzleGenerator
+    from sudoq.generators.reducers import (
+        GenericReducer,
+        RandomCellReducer,
+        DigitReducer,
+        CompositeReducer,
+    )
+
     if difficulty == "easy":
         generator = PuzzleGenerator(reducers=[RandomCellReducer()], min_clues=25)
     elif difficulty == "medium":
@@ -72,19 +89,42 @@ def generate_puzzle(difficulty: Difficulty = "medium") -> str:
 
     else:
         raise ValueError("unknown difficulty")
-    return generator.generate(tries=settings.MAX_GENERATION_TRIES).to_string()
+    return generator.generate(tries=tries or settings.MAX_GENERATION_TRIES).to_string()
 
 
 def validate_grid(board_str: str) -> bool:
     """Check if grid is valid (no conflicts)."""
+    from sudoq import Grid
+
     try:
         return Grid.from_string(board_str).is_valid()
     except ValueError:
         return False
 
 
+def puzzle_hash(board_str: str) -> str:
+    """Content hash identifying a starting grid."""
+    return hashlib.sha256(board_str.encode()).hexdigest()
+
+
+def matches_solution(board_str: str, solution: str) -> bool:
+    """Check that every filled cell of the board agrees with the solution."""
+    return all(cell in ("0", sol) for cell, sol in zip(board_str, solution))
+
+
+def count_solutions(board_str: str, limit: int = 2) -> int:
+    """Count solutions up to limit, so 0, 1 or "many" with the default.
+
+    Raises ValueError for malformed boards or when the search budget runs out.
+    """
+    solver = BitmaskSolver(max_nodes=settings.BOARD_VALIDATION_MAX_NODES)
+    return solver.count_solutions(board_str, limit)
+
+
 def is_solved(board_str: str) -> bool:
     """Check if grid is complete and valid."""
+    from sudoq import Grid
+
     try:
         grid = Grid.from_string(board_str)
         return grid.is_complete() and grid.is_valid()
@@ -94,6 +134,8 @@ def is_solved(board_str: str) -> bool:
 
 def is_valid_move(board_str: str, row: int, col: int, value: int) -> bool:
     """Check if placing value at position is valid."""
+    from sudoq import Grid
+
     if not (0 <= row < 9 and 0 <= col < 9 and 1 <= value <= 9):
         return False
     grid = Grid.from_string(board_str)
@@ -105,6 +147,8 @@ def is_valid_move(board_str: str, row: int, col: int, value: int) -> bool:
 
 def make_move(board_str: str, row: int, col: int, value: int) -> Optional[str]:
     """Make move if valid, return new board_str or None."""
+    from sudoq import Grid, Cell
+
     if not is_valid_move(board_str, row, col, value):
         return None
     grid = Grid.from_string(board_str)
@@ -114,101 +158,66 @@ def make_move(board_str: str, row: int, col: int, value: int) -> Optional[str]:
 
 def get_solution(board_str: str) -> Optional[str]:
     """Return the fully solved board string if solvable, None otherwise."""
-    try:
-        grid = Grid.from_string(board_str)
-        if grid.is_complete():
-            return board_str
-        solver = BacktrackingSolver()
-        solved = solver.solve(grid)
-        if solved.is_complete():
-            return solved.to_string()
-        return None
-    except ValueError:
-        return None
+    return get_engine().solve(board_str)
 
 
 def get_hint(board_str: str) -> Hint:
-    """Find the next logical hint using strategic solver strategies."""
+    """Find the next logical hint using the engine's solver strategies."""
     try:
-        grid = Grid.from_string(board_str)
-        if grid.is_complete():
-            return None
-
-        random.shuffle(_all_strategies)
-        for strategy in _all_strategies:
-            cell = strategy.get_placement(grid)
-            if cell:
-                # Found a placement, convert to hint format
-                r, c = cell.position
-                value = cell.value
-
-                # Get strategy name
-                strategy_name = strategy.__class__.__name__.lower()
-
-                # Create explanation based on strategy
-                if strategy_name == "nakedsingle":
-                    explanation = f"Cell ({r}, {c}) can only contain {value}"
-                elif strategy_name == "hiddensingle":
-                    explanation = f"Value {value} can only go in cell ({r}, {c}) in its row/column/box"
-                elif strategy_name in ["nakedpair", "nakedtriple", "nakedquad"]:
-                    set_name = strategy_name.replace("naked", "").lower()
-                    explanation = f"Naked {set_name} eliminates candidates, allowing {value} at ({r}, {c})"
-                elif strategy_name in ["hiddenpair", "hiddentriple", "hiddenquad"]:
-                    set_name = strategy_name.replace("hidden", "").lower()
-                    explanation = (
-                        f"Hidden {set_name} indicates {value} belongs at ({r}, {c})"
-                    )
-                else:
-                    explanation = f"{strategy_name.replace('_', ' ').title()} technique found {value} at ({r}, {c})"
-
-                return Hint(
-                    strategy=strategy_name,
-                    explanation=explanation,
-                    action="place_value",
-                    primary_cell={"row": r, "col": c},
-                    affected_cells=[{"row": r, "col": c}],
-                    value=value,
-                )
+        cells = parse_board(board_str)
+    except ValueError:
+        return None
+    if all(cells):
+        return None
 
-        # No logical hint found, fall back to revealing a value
-        solution = get_solution(board_str)
-        if not solution:
-            return None
-
-        empty_cells = [
-            (r, c) for r in range(9) for c in range(9) if grid.get_cell((r, c)) == 0
-        ]
-        if not empty_cells:
-            return None
-
-        r, c = random.choice(empty_cells)
-        value = int(solution[r * 9 + c])
-        return {
-            "strategy": "solution_hint",
-            "explanation": f"The value {value} goes in cell ({r}, {c}).",
-            "action": "place_value",
-            "primary_cell": {"row": r, "col": c},
-            "affected_cells": [{"row": r, "col": c}],
-            "value": value,
-        }
+    step = get_engine().next_step(board_str)
+    if step:
+        # Found a placement, convert to hint format
+        strategy_name, r, c, value = step
+
+        # Create explanation based on strategy
+        if strategy_name == "nakedsingle":
+            explanation = f"Cell ({r}, {c}) can only contain {value}"
+        elif strategy_name == "hiddensingle":
+            explanation = (
+                f"Value {value} can only go in cell ({r}, {c}) in its row/column/box"
+            )
+        elif strategy_name in ["nakedpair", "nakedtriple", "nakedquad"]:
+            set_name = strategy_name.replace("naked", "").lower()
+            explanation = f"Naked {set_name} eliminates candidates, allowing {value} at ({r}, {c})"
+        elif strategy_name in ["hiddenpair", "hiddentriple", "hiddenquad"]:
+            set_name = strategy_name.replace("hidden", "").lower()
+            explanation = f"Hidden {set_name} indicates {value} belongs at ({r}, {c})"
+        else:
+            explanation = f"{strategy_name.replace('_', ' ').title()} technique found {value} at ({r}, {c})"
+
+        return Hint(
+            strategy=strategy_name,
+            explanation=explanation,
+            action="place_value",
+            primary_cell={"row": r, "col": c},
+            affected_cells=[{"row": r, "col": c}],
+            value=value,
+        )
 
-    except ValueError:
+    # No logical hint found, fall back to revealing a value
+    solution = get_solution(board_str)
+    if not solution:
         return None
 
+    empty_cells = [(i // 9, i % 9) for i in range(81) if not cells[i]]
+    r, c = random.choice(empty_cells)
+    value = int(solution[r * 9 + c])
+    return {
+        "strategy": "solution_hint",
+        "explanation": f"The value {value} goes in cell ({r}, {c}).",
+        "action": "place_value",
+        "primary_cell": {"row": r, "col": c},
+        "affected_cells": [{"row": r, "col": c}],
+        "value": value,
+    }
+
 
 def get_candidates_all(board_str: str) -> List[List[List[int]]]:
     """Return all candidates as 9x9 list of lists of int."""
-    try:
-        grid = Grid.from_string(board_str)
-        candidates = []
-        for r in range(9):
-            row = []
-            for c in range(9):
-                if grid.get_cell((r, c)) != 0:
-                    row.append([])
-                else:
-                    row.append(list(grid.get_candidates((r, c))))
-            candidates.append(row)
-        return candidates
-    except ValueError:
-        return [[[0]]]
+    return get_engine().candidates(board_str)
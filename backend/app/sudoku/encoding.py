@@ -0,0 +1,83 @@
+"""Compact wire format for boards and candidates.
+
+Clients opt in with `?format=compact` or by sending
+`Accept: application/vnd.sudoq.compact+json`. Candidates are sent as 81
+nine-bit masks in row-major order, bit d-1 set when digit d is possible,
+instead of nested lists.
+"""
+
+import json
+from typing import List, Optional
+
+from fastapi import Request, Response
+
+COMPACT_MEDIA_TYPE = "application/vnd.sudoq.compact+json"
+
+# Fields of the SudokuGame schema, in the same order
+GAME_FIELDS = (
+    "board_state",
+    "mistakes_p1",
+    "mistakes_p2",
+    "valid_moves_p1",
+    "valid_moves_p2",
+    "id",
+    "player1_id",
+    "player2_id",
+    "difficulty",
+    "puzzle_id",
+)
+
+
+def pack_board(board_str: str) -> bytes:
+    """Two cells per byte, 41 bytes for a board, empty cells as 0."""
+    digits = [0 if ch == "." else int(ch) for ch in board_str] + [0]
+    return bytes(digits[i] << 4 | digits[i + 1] for i in range(0, 81, 2))
+
+
+def unpack_board(packed: bytes) -> str:
+    return "".join(f"{byte >> 4}{byte & 15}" for byte in packed)[:81]
+
+
+def wants_compact(request: Request, format: Optional[str]) -> bool:
+    if format is not None:
+        return format == "compact"
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def pack_candidates(candidates: List[List[List[int]]]) -> List[int]:
+    masks = []
+    for row in candidates:
+        for cell in row:
+            mask = 0
+            for digit in cell:
+                if digit:
+                    mask |= 1 << (digit - 1)
+            masks.append(mask)
+    return masks
+
+
+def unpack_candidates(masks: List[int]) -> List[List[List[int]]]:
+    return [
+        [[d for d in range(1, 10) if masks[r * 9 + c] >> (d - 1) & 1] for c in range(9)]
+        for r in range(9)
+    ]
+
+
+def compact_game(game, candidates: List[List[List[int]]]) -> dict:
+    """Game fields without validation, with the candidate masks included."""
+    data = {field: getattr(game, field) for field in GAME_FIELDS}
+    try:
+        data["digit_types"] = json.loads(game.digit_types or "null")
+    except json.JSONDecodeError:
+        data["digit_types"] = []
+    data["created_at"] = game.created_at.isoformat()
+    data["updated_at"] = game.updated_at.isoformat()
+    # Saves the client a candidates request after every move
+    data["candidates"] = pack_candidates(candidates)
+    return data
+
+
+def compact_response(data: dict) -> Response:
+    # Serialized directly, skipping response model validation
+    body = json.dumps(data, separators=(",", ":")).encode()
+    return Response(body, media_type=COMPACT_MEDIA_TYPE)
@@ -0,0 +1,175 @@
+import functools
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.sudoku.solver import (
+    ALL_DIGITS,
+    BOX,
+    COL,
+    DIGITS,
+    POPCOUNT,
+    ROW,
+    UNITS,
+    BitmaskSolver,
+    parse_board,
+)
+
+# (strategy name, row, col, value) of the next logical placement
+Step = Tuple[str, int, int, int]
+
+
+class SolverEngine(ABC):
+    """Solving operations behind the game endpoints.
+
+    Every method takes an 81 character board and returns None, or [[[0]]]
+    for candidates, when the board cannot be read or solved.
+    """
+
+    name: str
+
+    @abstractmethod
+    def solve(self, board_str: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def candidates(self, board_str: str) -> List[List[List[int]]]: ...
+
+    @abstractmethod
+    def next_step(self, board_str: str) -> Optional[Step]:
+        """Next placement found by a logical strategy, without guessing."""
+
+
+@functools.cache
+def sudoq_strategies() -> list:
+    from sudoq.solvers.strategies import all_strategies
+
+    return list(all_strategies)
+
+
+class SudoqEngine(SolverEngine):
+    """sudoq's backtracking solver and human-style strategies."""
+
+    name = "sudoq"
+
+    def solve(self, board_str: str) -> Optional[str]:
+        from sudoq import Grid
+        from sudoq.solvers import BacktrackingSolver
+
+        try:
+            grid = Grid.from_string(board_str)
+            if grid.is_complete():
+                return board_str
+            solved = BacktrackingSolver().solve(grid)
+            if solved.is_complete():
+                return solved.to_string()
+            return None
+        except ValueError:
+            return None
+
+    def candidates(self, board_str: str) -> List[List[List[int]]]:
+        from sudoq import Grid
+
+        try:
+            grid = Grid.from_string(board_str)
+            candidates = []
+            for r in range(9):
+                row = []
+                for c in range(9):
+                    if grid.get_cell((r, c)) != 0:
+                        row.append([])
+                    else:
+                        row.append(list(grid.get_candidates((r, c))))
+                candidates.append(row)
+            return candidates
+        except ValueError:
+            return [[[0]]]
+
+    def next_step(self, board_str: str) -> Optional[Step]:
+        from sudoq import Grid
+
+        try:
+            grid = Grid.from_string(board_str)
+        except ValueError:
+            return None
+        # Shuffle a copy, the cached list is shared by threads running hints
+        strategies = sudoq_strategies()
+        for strategy in random.sample(strategies, len(strategies)):
+            cell = strategy.get_placement(grid)
+            if cell:
+                r, c = cell.position
+                return strategy.__class__.__name__.lower(), r, c, cell.value
+        return None
+
+
+class BitmaskEngine(SolverEngine):
+    """The bitmask exact-cover solver, with naked and hidden singles as its
+    logical strategies."""
+
+    name = "bitmask"
+
+    def solve(self, board_str: str) -> Optional[str]:
+        try:
+            return BitmaskSolver().solve(board_str)
+        except ValueError:
+            return None
+
+    def _masks(self, cells: List[int]) -> List[int]:
+        rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+        for i, value in enumerate(cells):
+            if value:
+                bit = 1 << (value - 1)
+                rows[ROW[i]] |= bit
+                cols[COL[i]] |= bit
+                boxes[BOX[i]] |= bit
+        return [
+            0
+            if cells[i]
+            else ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]]) & ALL_DIGITS
+            for i in range(81)
+        ]
+
+    def candidates(self, board_str: str) -> List[List[List[int]]]:
+        try:
+            masks = self._masks(parse_board(board_str))
+        except ValueError:
+            return [[[0]]]
+        return [[DIGITS[masks[r * 9 + c]] for c in range(9)] for r in range(9)]
+
+    def next_step(self, board_str: str) -> Optional[Step]:
+        try:
+            cells = parse_board(board_str)
+        except ValueError:
+            return None
+        masks = self._masks(cells)
+        for i in range(81):
+            if not cells[i] and POPCOUNT[masks[i]] == 1:
+                return "nakedsingle", ROW[i], COL[i], DIGITS[masks[i]][0]
+        for unit in UNITS:
+            for value in range(1, 10):
+                bit = 1 << (value - 1)
+                places = [i for i in unit if masks[i] & bit]
+                if len(places) == 1:
+                    i = places[0]
+                    return "hiddensingle", ROW[i], COL[i], value
+        return None
+
+
+ENGINES: Dict[str, SolverEngine] = {}
+
+
+def register_engine(engine: SolverEngine):
+    ENGINES[engine.name] = engine
+
+
+def get_engine(name: Optional[str] = None) -> SolverEngine:
+    """Return the named engine, by default the one set in SOLVER_ENGINE."""
+    name = name or settings.SOLVER_ENGINE
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown solver engine: {name}")
+
+
+register_engine(SudoqEngine())
+register_engine(BitmaskEngine())
@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+from typing import Callable, Optional
+
+from app.config import settings
+from app.sudoku.core import SUDOQ_MODULES, Difficulty, generate_puzzle
+
+# Cheaper recipe to use when a difficulty does not fit its time budget
+FALLBACK_DIFFICULTY = {"expert": "hard", "hard": "medium", "medium": "easy"}
+
+
+class GenerationBudgetExceeded(Exception):
+    pass
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+_context = None
+
+
+def _get_context():
+    # A forkserver forks children from a clean, single threaded process with
+    # the sudoku modules already imported, so each generation starts quickly
+    global _context
+    if _context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            _context = multiprocessing.get_context("forkserver")
+            _context.set_forkserver_preload(["app.sudoku.core", *SUDOQ_MODULES])
+        else:
+            _context = multiprocessing.get_context("spawn")
+    return _context
+
+
+def start_forkserver():
+    """Start the forkserver ahead of the first generation."""
+    if _get_context().get_start_method() == "forkserver":
+        from multiprocessing import forkserver
+
+        forkserver.ensure_running()
+
+
+def _generate_worker(difficulty: Difficulty, tries: int, conn):
+    # One try per generate call, so the parent hears when each try starts
+    try:
+        for attempt in range(1, tries + 1):
+            conn.send(("try", attempt))
+            try:
+                board = generate_puzzle(difficulty, tries=1)
+            except Exception:
+                if attempt == tries:
+                    raise
+                continue
+            conn.send(("done", board))
+            return
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+async def generate_in_subprocess(
+    difficulty: Difficulty,
+    budget: Optional[float] = None,
+    cancel: Optional[asyncio.Event] = None,
+    on_try: Optional[Callable[[int, int], None]] = None,
+) -> str:
+    """Generate a puzzle in a child process without blocking the event loop.
+
+    The child is killed as soon as `budget` seconds have passed, `cancel` is
+    set or the awaiting task is cancelled, so abandoned work stops at once.
+    `on_try` is called with the try number and MAX_GENERATION_TRIES as each
+    try starts.
+    """
+    context = _get_context()
+    loop = asyncio.get_running_loop()
+    tries = settings.MAX_GENERATION_TRIES
+    reader, writer = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_generate_worker, args=(difficulty, tries, writer), daemon=True
+    )
+    process.start()
+    writer.close()
+
+    deadline = None if budget is None else loop.time() + budget
+    readable = asyncio.Event()
+    loop.add_reader(reader.fileno(), readable.set)
+    waiters = set()
+    if cancel is not None:
+        waiters.add(asyncio.ensure_future(cancel.wait()))
+    try:
+        while True:
+            while reader.poll():
+                try:
+                    kind, value = reader.recv()
+                except EOFError:
+                    raise RuntimeError("Puzzle generation process exited unexpectedly")
+                if kind == "done":
+                    return value
+                if kind == "error":
+                    raise ValueError(value)
+                if on_try:
+                    on_try(value, tries)
+
+            # The reader callback sets it again while unread data is left
+            readable.clear()
+            timeout = None if deadline is None else deadline - loop.time()
+            ready = asyncio.ensure_future(readable.wait())
+            try:
+                done, _ = await asyncio.wait(
+                    waiters | {ready},
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                ready.cancel()
+            if ready not in done:
+                if cancel is not None and cancel.is_set():
+                    raise GenerationCancelled(difficulty)
+                raise GenerationBudgetExceeded(difficulty)
+    finally:
+        loop.remove_reader(reader.fileno())
+        for waiter in waiters:
+            waiter.cancel()
+        reader.close()
+        if process.is_alive():
+            process.kill()
+        await asyncio.to_thread(process.join)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.admission import Overloaded, admit
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import metrics
+from app.sudoku.cache import game_cache
+from app.sudoku.generation import GenerationBudgetExceeded, GenerationCancelled
+from app.sudoku.schemas import SingleplayerGame
+from app.sudoku.service import GameService
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob:
+    """A singleplayer game being created in the background.
+
+    Every stage change is recorded as an event, so a stream that connects
+    late or reconnects replays what it missed.
+    """
+
+    def __init__(self, user_id: int, difficulty: str, digit_types: Optional[List[str]]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.difficulty = difficulty
+        self.digit_types = digit_types
+        self.status = "pending"
+        self.stage = "pending"
+        self.events: List[Tuple[str, dict]] = []
+        self.cancel = asyncio.Event()
+        self.finished_at: Optional[float] = None
+        self._started = time.monotonic()
+        self._updated = asyncio.Event()
+
+    @property
+    def elapsed(self) -> float:
+        return round(time.monotonic() - self._started, 3)
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def _publish(self, event: str, data: dict):
+        self.events.append((event, {**data, "elapsed_seconds": self.elapsed}))
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def progress(self, stage: str, **details):
+        self.stage = stage
+        self._publish("progress", {"stage": stage, **details})
+
+    def finish(self, status: str, event: str, **data):
+        self.status = status
+        self.finished_at = time.monotonic()
+        self._publish(event, data)
+
+    async def wait(self, seen: int, timeout: float) -> bool:
+        """Wait until there are more than `seen` events or `timeout` passes."""
+        if len(self.events) > seen:
+            return True
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> dict:
+        result = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "elapsed_seconds": self.elapsed,
+        }
+        if self.done:
+            result.update(self.events[-1][1])
+        return result
+
+
+class GenerationJobs:
+    """In-memory registry of generation jobs for this process."""
+
+    def __init__(self):
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._tasks = set()
+
+        metrics.gauge("generation_jobs.running", self._running)
+
+    def _running(self) -> int:
+        return sum(not job.done for job in self._jobs.values())
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self, user_id: int, difficulty: str, digit_types: Optional[List[str]] = None
+    ) -> GenerationJob:
+        self._prune()
+        if self._running() >= settings.GENERATION_JOBS_MAX:
+            metrics.inc("generation_jobs.rejected")
+            raise Overloaded(
+                503,
+                "Too many generation jobs",
+                settings.GENERATION_JOB_HEARTBEAT_SECONDS,
+            )
+
+        job = GenerationJob(user_id, difficulty, digit_types)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        metrics.inc("generation_jobs.submitted")
+        return job
+
+    def _prune(self):
+        expired = time.monotonic() - settings.GENERATION_JOB_TTL_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at < expired:
+                del self._jobs[job_id]
+
+    async def _run(self, job: GenerationJob):
+        job.status = "running"
+        try:
+            async with admit("singleplayer", f"user:{job.user_id}"):
+                async with AsyncSessionLocal() as db:
+                    service = GameService(db, game_cache)
+                    game = await service.create_singleplayer_game(
+                        job.user_id,
+                        job.difficulty,
+                        job.digit_types,
+                        job.cancel,
+                        job.progress,
+                        settings.GENERATION_JOB_BUDGET_SECONDS,
+                    )
+                    payload = SingleplayerGame.model_validate(game).model_dump(
+                        mode="json"
+                    )
+            job.finish("done", "game", game=payload)
+        except GenerationCancelled:
+            job.finish("cancelled", "error", status_code=499, detail="Job cancelled")
+        except GenerationBudgetExceeded:
+            job.finish(
+                "failed", "error", status_code=503, detail="Puzzle generation timed out"
+            )
+        except HTTPException as e:
+            job.finish("failed", "error", status_code=e.status_code, detail=e.detail)
+        except ValueError as e:
+            job.finish("failed", "error", status_code=400, detail=str(e))
+        except Exception:
+            logger.exception("Generation job %s failed", job.id)
+            job.finish("failed", "error", status_code=500, detail="Generation failed")
+        metrics.inc(f"generation_jobs.{job.status}")
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}", f"data: {json.dumps(data)}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_events(
+    job: GenerationJob, last_event_id: int = -1
+) -> AsyncIterator[str]:
+    """Server-sent events for a job, ending after its final event.
+
+    Recorded events carry their index as id, so a reconnecting client sends
+    Last-Event-ID and resumes. Between events the current stage is repeated
+    with the elapsed time, which also keeps proxies from timing out.
+    """
+    seen = last_event_id + 1
+    while True:
+        while seen < len(job.events):
+            event, data = job.events[seen]
+            yield _sse(event, data, seen)
+            seen += 1
+        if job.done:
+            return
+        if not await job.wait(seen, settings.GENERATION_JOB_HEARTBEAT_SECONDS):
+            yield _sse("progress", {"stage": job.stage, "elapsed_seconds": job.elapsed})
+
+
+generation_jobs = GenerationJobs()
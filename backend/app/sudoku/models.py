@@ -1,12 +1,51 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Text,
+    JSON,
+    LargeBinary,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
 
 
+class Puzzle(Base):
+    __tablename__ = "puzzles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(
+        String(64), unique=True, index=True, nullable=False
+    )  # sha256 of the starting grid
+    board = Column(Text, nullable=False)  # Starting grid
+    solution = Column(Text, nullable=True)
+    clue_count = Column(Integer, nullable=False)
+    difficulty = Column(String, nullable=True)
+    rating = Column(Integer, nullable=True)  # Solver guesses, higher is harder
+    created_at = Column(DateTime, default=func.now())
+
+    # Relationships
+    games = relationship("SudokuGame", back_populates="puzzle")
+
+
+class QueuedPuzzle(Base):
+    __tablename__ = "puzzle_queue"
+
+    id = Column(Integer, primary_key=True, index=True)
+    difficulty = Column(String, nullable=False, index=True)
+    puzzle_id = Column(Integer, ForeignKey("puzzles.id"), nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+
 class SudokuGame(Base):
     __tablename__ = "sudoku_games"
+    # Archived games leave this table; without AUTOINCREMENT SQLite would
+    # hand the highest archived id to the next new game
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     board_state = Column(Text, nullable=False)  # Serialized game state
@@ -14,6 +53,7 @@ class SudokuGame(Base):
         Text, nullable=True
     )  # JSON string of digit types (e.g., ["1","2",...,"9"] or ["😉","😂",...])
     difficulty = Column(String, nullable=True)
+    puzzle_id = Column(Integer, ForeignKey("puzzles.id"), nullable=True, index=True)
     player1_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     player2_id = Column(
         Integer, ForeignKey("users.id"), nullable=True
@@ -23,7 +63,7 @@ class SudokuGame(Base):
     valid_moves_p1 = Column(Integer, default=0)
     valid_moves_p2 = Column(Integer, default=0)
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     player1 = relationship(
@@ -32,3 +72,24 @@ class SudokuGame(Base):
     player2 = relationship(
         "User", back_populates="games_as_player2", foreign_keys=[player2_id]
     )
+    puzzle = relationship("Puzzle", back_populates="games")
+
+
+class ArchivedGame(Base):
+    __tablename__ = "sudoku_games_archive"
+
+    # Same id as the live game it was moved from
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    board_packed = Column(LargeBinary, nullable=False)  # See encoding.pack_board
+    digit_types = Column(Text, nullable=True)
+    difficulty = Column(String, nullable=True)
+    puzzle_id = Column(Integer, ForeignKey("puzzles.id"), nullable=True)
+    player1_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    player2_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    mistakes_p1 = Column(Integer, default=0)
+    mistakes_p2 = Column(Integer, default=0)
+    valid_moves_p1 = Column(Integer, default=0)
+    valid_moves_p2 = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=func.now())
@@ -0,0 +1,39 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.sudoku.core import puzzle_hash
+from app.sudoku.models import Puzzle as PuzzleModel
+from app.sudoku.solver import BitmaskSolver
+
+
+async def find_puzzle(db: AsyncSession, content_hash: str):
+    result = await db.execute(
+        select(PuzzleModel).where(PuzzleModel.content_hash == content_hash)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_or_create_puzzle(db: AsyncSession, board: str, difficulty: str = None):
+    # Puzzles are shared by content, solving and rating happen once per grid
+    content_hash = puzzle_hash(board)
+    puzzle = await find_puzzle(db, content_hash)
+    if puzzle:
+        return puzzle
+
+    solver = BitmaskSolver()
+    puzzle = PuzzleModel(
+        content_hash=content_hash,
+        board=board,
+        solution=solver.solve(board),
+        clue_count=81 - board.count("0"),
+        difficulty=difficulty,
+        rating=solver.guesses,
+    )
+    try:
+        async with db.begin_nested():
+            db.add(puzzle)
+    except IntegrityError:
+        # Inserted concurrently by another request
+        puzzle = await find_puzzle(db, content_hash)
+    return puzzle
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from typing import List, Optional, Set
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import metrics
+from app.sudoku.generation import GenerationBudgetExceeded, generate_in_subprocess
+from app.sudoku.models import QueuedPuzzle
+from app.sudoku.puzzles import get_or_create_puzzle
+
+logger = logging.getLogger(__name__)
+
+
+class PuzzleQueue:
+    """Ready puzzles per difficulty, shared by every worker through the database.
+
+    Claiming is a single DELETE ... RETURNING of the oldest row, which skips
+    rows locked by concurrent claims on Postgres and relies on SQLite's
+    database-level write lock otherwise. Any worker that sees the queue drop
+    below the low watermark refills it up to the target.
+    """
+
+    def __init__(self, low_watermark: int, target: int):
+        self.low_watermark = low_watermark
+        self.target = target
+        # Difficulties with a refill running in this process
+        self._refilling: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def claim(self, difficulty: str) -> Optional[int]:
+        """Take the oldest ready puzzle id.
+
+        The claim commits in its own short transaction, so no lock is held
+        while the caller generates or saves. Hand the id back with `release`
+        when the game cannot be created.
+        """
+        oldest = (
+            select(QueuedPuzzle.id)
+            .where(QueuedPuzzle.difficulty == difficulty)
+            .order_by(QueuedPuzzle.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(QueuedPuzzle)
+                .where(QueuedPuzzle.id == oldest)
+                .returning(QueuedPuzzle.puzzle_id)
+            )
+            puzzle_id = result.scalar_one_or_none()
+            await db.commit()
+            low = await self._count(db, difficulty) < self.low_watermark
+        metrics.inc("puzzle_queue.claimed" if puzzle_id else "puzzle_queue.empty")
+
+        if low:
+            self.refill(difficulty)
+        return puzzle_id
+
+    async def release(self, difficulty: str, puzzle_ids: List[int]):
+        """Put claimed puzzles back at the end of the queue."""
+        if not puzzle_ids:
+            return
+        async with AsyncSessionLocal() as db:
+            db.add_all(
+                QueuedPuzzle(difficulty=difficulty, puzzle_id=puzzle_id)
+                for puzzle_id in puzzle_ids
+            )
+            await db.commit()
+        metrics.inc("puzzle_queue.released", len(puzzle_ids))
+
+    async def _count(self, db: AsyncSession, difficulty: str) -> int:
+        result = await db.execute(
+            select(func.count())
+            .select_from(QueuedPuzzle)
+            .where(QueuedPuzzle.difficulty == difficulty)
+        )
+        return result.scalar_one()
+
+    def refill(self, difficulty: str):
+        """Start a background refill unless one is already running here."""
+        if difficulty not in settings.PUZZLE_QUEUE_DIFFICULTIES:
+            return
+        if difficulty in self._refilling:
+            return
+        self._refilling.add(difficulty)
+        task = asyncio.create_task(self._refill(difficulty))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def refill_all(self):
+        for difficulty in settings.PUZZLE_QUEUE_DIFFICULTIES:
+            self.refill(difficulty)
+
+    async def _refill(self, difficulty: str):
+        try:
+            while True:
+                # Re-check every round, other workers refill the same queue
+                async with AsyncSessionLocal() as db:
+                    if await self._count(db, difficulty) >= self.target:
+                        return
+                board = await generate_in_subprocess(
+                    difficulty, settings.GENERATION_BUDGET_SECONDS
+                )
+                async with AsyncSessionLocal() as db:
+                    puzzle = await get_or_create_puzzle(db, board, difficulty)
+                    db.add(QueuedPuzzle(difficulty=difficulty, puzzle_id=puzzle.id))
+                    await db.commit()
+                metrics.inc("puzzle_queue.refilled")
+        except GenerationBudgetExceeded:
+            metrics.inc("puzzle_queue.refill_timeouts")
+        except Exception:
+            metrics.inc("puzzle_queue.refill_errors")
+            logger.exception("Refilling the %s puzzle queue failed", difficulty)
+        finally:
+            self._refilling.discard(difficulty)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+puzzle_queue = (
+    PuzzleQueue(settings.PUZZLE_QUEUE_LOW_WATERMARK, settings.PUZZLE_QUEUE_TARGET)
+    if settings.PUZZLE_QUEUE_ENABLED
+    else None
+)
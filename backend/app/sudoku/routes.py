@@ -1,9 +1,24 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.admission import admit
 from app.database import get_db
+from app.ndjson import NDJSON_MEDIA_TYPE, dump_lines, iter_lines
+from app.sudoku.cache import game_cache
+from app.sudoku.encoding import (
+    compact_game,
+    compact_response,
+    pack_candidates,
+    wants_compact,
+)
+from app.sudoku.generation import GenerationBudgetExceeded, GenerationCancelled
+from app.sudoku.jobs import generation_jobs, stream_events
 from app.sudoku.schemas import (
+    SingleplayerGame,
+    SudokuGameBatchCreate,
     SudokuGame,
     SudokuGameCreate,
     GameMove,
@@ -17,7 +32,7 @@ router = APIRouter()
 
 def get_game_service(db: AsyncSession = Depends(get_db)) -> GameService:
     # Dependency injection for GameService
-    return GameService(db)
+    return GameService(db, game_cache)
 
 
 @router.post("/", response_model=SudokuGame)
@@ -31,17 +46,51 @@ async def create_game(
             game.player2_id,
             game.difficulty,
             game.digit_types,
+            game.puzzle_id,
         )
         return db_game
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/export")
+async def export_games(
+    player_id: Optional[int] = None,
+    service: GameService = Depends(get_game_service),
+):
+    async def body():
+        async for rows in service.export_games(player_id):
+            yield dump_lines(SudokuGame.model_validate(dict(row)) for row in rows)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.post("/import")
+async def import_games(
+    request: Request,
+    keep_ids: bool = False,
+    service: GameService = Depends(get_game_service),
+):
+    try:
+        imported = await service.import_games(iter_lines(request.stream()), keep_ids)
+        return {"imported": imported}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/{game_id}", response_model=SudokuGame)
-async def read_game(game_id: int, service: GameService = Depends(get_game_service)):
+async def read_game(
+    game_id: int,
+    request: Request,
+    format: Optional[str] = None,
+    service: GameService = Depends(get_game_service),
+):
     game = await service.get_game(game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
+    if wants_compact(request, format):
+        candidates = await service.board_candidates(game.board_state)
+        return compact_response(compact_game(game, candidates))
     return game
 
 
@@ -50,9 +99,11 @@ async def read_games(
     player_id: int = None,
     skip: int = 0,
     limit: int = 100,
+    puzzle_id: int = None,
+    archived: bool = False,
     service: GameService = Depends(get_game_service),
 ):
-    games = await service.get_games(player_id, skip, limit)
+    games = await service.get_games(player_id, skip, limit, puzzle_id, archived)
     return games
 
 
@@ -64,28 +115,131 @@ async def delete_game(game_id: int, service: GameService = Depends(get_game_serv
     return {"message": "Game deleted"}
 
 
-@router.post("/singleplayer", response_model=SudokuGame)
+def _client_key(request: Request) -> str:
+    # For requests without a single player id, limit them per client address
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+
+async def _cancel_on_disconnect(request: Request, cancel: asyncio.Event):
+    while not cancel.is_set():
+        if await request.is_disconnected():
+            cancel.set()
+            return
+        await asyncio.sleep(0.5)
+
+
+@router.post("/singleplayer", response_model=SingleplayerGame)
 async def create_singleplayer_game(
     game: SudokuGameCreate,
+    request: Request,
     service: GameService = Depends(get_game_service),
 ):
-    # db_game = await service.create_singleplayer_game(user_id, difficulty, digit_types)
-    db_game = await service.create_singleplayer_game(
-        game.player1_id, game.difficulty, game.digit_types
+    # Stop generating once the client has gone away
+    cancel = asyncio.Event()
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, cancel))
+    try:
+        async with admit("singleplayer", f"user:{game.player1_id}"):
+            db_game = await service.create_singleplayer_game(
+                game.player1_id, game.difficulty or "medium", game.digit_types, cancel
+            )
+        return db_game
+    except GenerationCancelled:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except GenerationBudgetExceeded:
+        raise HTTPException(status_code=503, detail="Puzzle generation timed out")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        cancel.set()
+        watcher.cancel()
+
+
+@router.post("/singleplayer/jobs", status_code=202)
+async def submit_singleplayer_job(game: SudokuGameCreate, request: Request):
+    # Returns at once, the game is created in the background
+    job = generation_jobs.submit(
+        game.player1_id, game.difficulty or "medium", game.digit_types
+    )
+    return {
+        **job.snapshot(),
+        "events_url": str(request.url_for("stream_singleplayer_job", job_id=job.id)),
+    }
+
+
+@router.get("/singleplayer/jobs/{job_id}")
+async def read_singleplayer_job(job_id: str):
+    job = generation_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+
+@router.get("/singleplayer/jobs/{job_id}/events")
+async def stream_singleplayer_job(
+    job_id: str, last_event_id: Optional[int] = Header(None)
+):
+    job = generation_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        stream_events(job, -1 if last_event_id is None else last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return db_game
+
+
+@router.delete("/singleplayer/jobs/{job_id}")
+async def cancel_singleplayer_job(job_id: str):
+    job = generation_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.cancel.set()
+    return job.snapshot()
+
+
+@router.post("/batch", response_model=List[SudokuGame])
+async def create_games_batch(
+    batch: SudokuGameBatchCreate,
+    request: Request,
+    service: GameService = Depends(get_game_service),
+):
+    cancel = asyncio.Event()
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, cancel))
+    try:
+        async with admit("batch", _client_key(request)):
+            return await service.create_games_batch(
+                batch.player_ids,
+                batch.difficulty or "medium",
+                batch.digit_types,
+                batch.shared_puzzle,
+                cancel,
+            )
+    except GenerationCancelled:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except GenerationBudgetExceeded:
+        raise HTTPException(status_code=503, detail="Puzzle generation timed out")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        cancel.set()
+        watcher.cancel()
 
 
 @router.put("/{game_id}/move", response_model=SudokuGame)
 async def make_move_on_game(
     game_id: int,
     move: GameMove,
+    request: Request,
+    format: Optional[str] = None,
     service: GameService = Depends(get_game_service),
 ):
     try:
         db_game = await service.make_move(
             game_id, move.player_id, move.row, move.col, move.value
         )
+        if wants_compact(request, format):
+            candidates = await service.board_candidates(db_game.board_state)
+            return compact_response(compact_game(db_game, candidates))
         return db_game
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -93,19 +247,23 @@ async def make_move_on_game(
 
 @router.get("/{game_id}/hint", response_model=Hint)
 async def get_hint_for_game(
-    game_id: int, service: GameService = Depends(get_game_service)
+    game_id: int, request: Request, service: GameService = Depends(get_game_service)
 ):
     try:
-        hint = await service.get_hint(game_id)
+        async with admit("hint", _client_key(request)):
+            hint = await service.get_hint(game_id)
         return hint
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{game_id}/solve")
-async def solve_game(game_id: int, service: GameService = Depends(get_game_service)):
+async def solve_game(
+    game_id: int, request: Request, service: GameService = Depends(get_game_service)
+):
     try:
-        solution = await service.solve_game(game_id)
+        async with admit("solve", _client_key(request)):
+            solution = await service.solve_game(game_id)
         return solution
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -113,10 +271,16 @@ async def solve_game(game_id: int, service: GameService = Depends(get_game_servi
 
 @router.get("/{game_id}/candidates", response_model=CandidatesMap)
 async def get_candidates(
-    game_id: int, service: GameService = Depends(get_game_service)
+    game_id: int,
+    request: Request,
+    format: Optional[str] = None,
+    service: GameService = Depends(get_game_service),
 ):
     try:
         candidates = await service.get_candidates(game_id)
+        if wants_compact(request, format):
+            masks = pack_candidates(candidates["candidates"])
+            return compact_response({"candidates": masks})
         return candidates
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 import json
 
+type Difficulty = Literal["easy", "medium", "hard", "expert"]
+
 
 class SudokuGameBase(BaseModel):
     board_state: str
@@ -15,7 +17,17 @@ class SudokuGameBase(BaseModel):
 
 class SudokuGameCreate(BaseModel):
     player1_id: int
-    difficulty: Optional[str] = None
+    player2_id: Optional[int] = None
+    board_state: Optional[str] = None
+    puzzle_id: Optional[int] = None  # Start from a stored puzzle instead
+    difficulty: Optional[Difficulty] = None
+    digit_types: Optional[List[str]] = None
+
+
+class SudokuGameBatchCreate(BaseModel):
+    player_ids: List[int]  # One singleplayer game per entry
+    difficulty: Optional[Difficulty] = None
+    shared_puzzle: bool = False  # Everyone plays the same puzzle
     digit_types: Optional[List[str]] = None
 
 
@@ -24,6 +36,7 @@ class SudokuGameInDBBase(SudokuGameBase):
     player1_id: int
     player2_id: Optional[int] = None
     difficulty: Optional[str] = None
+    puzzle_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -48,6 +61,29 @@ class SudokuGameInDB(SudokuGameInDBBase):
     pass
 
 
+class SingleplayerGame(SudokuGame):
+    # How the puzzle was obtained: "queued", "generated", "stored" or
+    # "fallback:<difficulty>"
+    generation_path: Optional[str] = None
+    generation_seconds: Optional[float] = None
+
+
+class SudokuGameImport(BaseModel):
+    id: Optional[int] = None
+    board_state: str
+    digit_types: Optional[List[str]] = None
+    difficulty: Optional[str] = None
+    puzzle_id: Optional[int] = None  # Kept only if the puzzle exists here
+    player1_id: int
+    player2_id: Optional[int] = None
+    mistakes_p1: int = 0
+    mistakes_p2: int = 0
+    valid_moves_p1: int = 0
+    valid_moves_p2: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class GameChallenge(BaseModel):
     opponent_id: int
 
@@ -1,22 +1,56 @@
+import asyncio
+import os
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from app.sudoku.models import SudokuGame as SudokuGameModel
+from sqlalchemy import delete, func, insert, select, or_
+from app.config import settings
+from app.metrics import metrics
+from app.ndjson import import_lines
+from app.singleflight import single_flight
+from app.stats.service import apply_stats, game_deltas, solve_deltas, stat_delta
+from app.sudoku.archive import live_row, load_archived, restore_game
+from app.sudoku.cache import ActiveGameCache
+from app.sudoku.models import (
+    ArchivedGame,
+    Puzzle as PuzzleModel,
+    SudokuGame as SudokuGameModel,
+)
+from app.sudoku.schemas import SudokuGameImport
+from app.sudoku.puzzles import get_or_create_puzzle
+from app.sudoku.queue import puzzle_queue
 from app.users.models import User
+from app.sudoku.generation import (
+    FALLBACK_DIFFICULTY,
+    GenerationBudgetExceeded,
+    GenerationCancelled,
+    generate_in_subprocess,
+)
 from app.sudoku.core import (
-    generate_puzzle,
+    count_solutions,
     is_solved,
     make_move,
     get_hint,
     get_solution,
     get_candidates_all,
+    matches_solution,
+    validate_grid,
 )
 import json
-from typing import List, Optional
+from typing import AsyncIterable, Callable, List, Optional, Tuple
+
+
+def _remaining(deadline: float, difficulty: str) -> float:
+    """Seconds left until `deadline`, raising once it has passed."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise GenerationBudgetExceeded(difficulty)
+    return remaining
 
 
 class GameService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: Optional[ActiveGameCache] = None):
         self.db = db
+        self.cache = cache
 
     async def create_game(
         self,
@@ -25,6 +59,7 @@ class GameService:
         player2_id: int = None,
         difficulty: str = None,
         digit_types: Optional[List[str]] = None,
+        puzzle_id: Optional[int] = None,
     ):
         # Check player1 exists
         result = await self.db.execute(select(User).where(User.id == player1_id))
@@ -35,26 +70,102 @@ class GameService:
             if not result2.scalar_one_or_none():
                 raise ValueError("Player2 not found")
 
+        if board_state:
+            # Only accept boards with exactly one solution
+            # Up to about a second of CPU, so off the event loop
+            solutions = await asyncio.to_thread(count_solutions, board_state)
+            if solutions == 0:
+                raise ValueError("Board has no solution")
+            if solutions > 1:
+                raise ValueError("Board has more than one solution")
+            puzzle = await get_or_create_puzzle(
+                self.db, board_state.replace(".", "0"), difficulty
+            )
+        elif puzzle_id:
+            puzzle = await self.db.get(PuzzleModel, puzzle_id)
+            if not puzzle:
+                raise ValueError("Puzzle not found")
+        else:
+            raise ValueError("board_state or puzzle_id is required")
+
         db_game = SudokuGameModel(
-            board_state=board_state,
+            board_state=puzzle.board,
             digit_types=json.dumps(digit_types) if digit_types else None,
             player1_id=player1_id,
             player2_id=player2_id,
-            difficulty=difficulty,
+            difficulty=difficulty or puzzle.difficulty,
+            puzzle_id=puzzle.id,
         )
         self.db.add(db_game)
+        await apply_stats(self.db, self._played_deltas(db_game))
         await self.db.commit()
         await self.db.refresh(db_game)
         return db_game
 
-    async def get_game(self, game_id: int):
+    def _played_deltas(self, db_game: SudokuGameModel) -> List[dict]:
+        return [
+            stat_delta(player_id, db_game.difficulty, games_played=1)
+            for player_id in (db_game.player1_id, db_game.player2_id)
+            if player_id
+        ]
+
+    async def _stored_solution(self, db_game: SudokuGameModel) -> Optional[str]:
+        if not db_game.puzzle_id:
+            return None
+        result = await self.db.execute(
+            select(PuzzleModel.solution).where(PuzzleModel.id == db_game.puzzle_id)
+        )
+        solution = result.scalar_one_or_none()
+        # Moves are only checked against candidates, so a board can drift away
+        if solution and matches_solution(db_game.board_state, solution):
+            return solution
+        return None
+
+    async def _load_game(self, game_id: int):
         result = await self.db.execute(
             select(SudokuGameModel).where(SudokuGameModel.id == game_id)
         )
         return result.scalar_one_or_none()
 
-    async def get_games(self, player_id: int = None, skip: int = 0, limit: int = 100):
+    async def _get_live_game(self, game_id: int):
+        if not self.cache:
+            return await self._load_game(game_id)
+
+        game = self.cache.get(game_id)
+        if game:
+            return game
+        game = await self._load_game(game_id)
+        if game:
+            # Cached games live detached from any request session
+            self.db.expunge(game)
+            game = await self.cache.put(game)
+        return game
+
+    async def get_game(self, game_id: int, restore: bool = False):
+        # Falls back to the archive; with `restore` an unsolved archived game
+        # moves back to the live table so it can be played again
+        game = await self._get_live_game(game_id)
+        if game:
+            return game
+        if restore and await restore_game(self.db, game_id):
+            return await self._get_live_game(game_id)
+        return await load_archived(self.db, game_id)
+
+    async def get_games(
+        self,
+        player_id: int = None,
+        skip: int = 0,
+        limit: int = 100,
+        puzzle_id: int = None,
+        archived: bool = False,
+    ):
+        if archived:
+            return await self._get_archived_games(player_id, skip, limit, puzzle_id)
+        if self.cache:
+            await self.cache.flush()
         query = select(SudokuGameModel)
+        if puzzle_id:
+            query = query.where(SudokuGameModel.puzzle_id == puzzle_id)
         if player_id:
             query = query.where(
                 or_(
@@ -65,8 +176,99 @@ class GameService:
         result = await self.db.execute(query.offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def _get_archived_games(
+        self,
+        player_id: int = None,
+        skip: int = 0,
+        limit: int = 100,
+        puzzle_id: int = None,
+    ):
+        query = select(ArchivedGame.__table__).order_by(ArchivedGame.id)
+        if puzzle_id:
+            query = query.where(ArchivedGame.puzzle_id == puzzle_id)
+        if player_id:
+            query = query.where(
+                or_(
+                    ArchivedGame.player1_id == player_id,
+                    ArchivedGame.player2_id == player_id,
+                )
+            )
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        return [SudokuGameModel(**live_row(row)) for row in result.mappings()]
+
+    async def export_games(self, player_id: int = None):
+        # Server-side cursor, yields one partition of row mappings at a time
+        if self.cache:
+            await self.cache.flush()
+        query = select(SudokuGameModel.__table__).order_by(SudokuGameModel.id)
+        if player_id:
+            query = query.where(
+                or_(
+                    SudokuGameModel.player1_id == player_id,
+                    SudokuGameModel.player2_id == player_id,
+                )
+            )
+        result = await self.db.stream(
+            query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.mappings().partitions():
+            yield rows
+
+        # Archived games follow the live ones
+        query = select(ArchivedGame.__table__).order_by(ArchivedGame.id)
+        if player_id:
+            query = query.where(
+                or_(
+                    ArchivedGame.player1_id == player_id,
+                    ArchivedGame.player2_id == player_id,
+                )
+            )
+        result = await self.db.stream(
+            query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.mappings().partitions():
+            yield [live_row(row) for row in rows]
+
+    async def import_games(
+        self, lines: AsyncIterable[Tuple[int, bytes]], keep_ids: bool = False
+    ) -> int:
+        return await import_lines(
+            self.db,
+            lines,
+            SudokuGameImport,
+            self._import_row,
+            self._insert_games,
+            SudokuGameModel.__tablename__,
+            keep_ids,
+        )
+
+    def _import_row(self, record: SudokuGameImport) -> dict:
+        if len(record.board_state) != 81 or not validate_grid(record.board_state):
+            raise ValueError("invalid board_state")
+        row = record.model_dump(exclude_none=True)
+        if record.digit_types:
+            row["digit_types"] = json.dumps(record.digit_types)
+        return row
+
+    async def _insert_games(self, rows: List[dict]):
+        # Puzzles are not exported, so references to unknown ones are dropped
+        puzzle_ids = {row["puzzle_id"] for row in rows if row.get("puzzle_id")}
+        if puzzle_ids:
+            result = await self.db.execute(
+                select(PuzzleModel.id).where(PuzzleModel.id.in_(puzzle_ids))
+            )
+            known = set(result.scalars().all())
+            for row in rows:
+                if row.get("puzzle_id") not in known:
+                    row["puzzle_id"] = None
+        await self.db.execute(insert(SudokuGameModel), rows)
+        await apply_stats(self.db, (d for row in rows for d in game_deltas(row)))
+
     async def update_game(self, game_id: int, update_data: dict):
-        game = await self.get_game(game_id)
+        if self.cache:
+            await self.cache.flush([game_id])
+            self.cache.discard(game_id)
+        game = await self._load_game(game_id)
         if not game:
             return None
         for key, value in update_data.items():
@@ -77,9 +279,17 @@ class GameService:
         return game
 
     async def delete_game(self, game_id: int):
-        game = await self.get_game(game_id)
+        if self.cache:
+            # Moves made so far still count towards the players' stats
+            await self.cache.flush([game_id])
+            self.cache.discard(game_id)
+        game = await self._load_game(game_id)
         if not game:
-            return False
+            result = await self.db.execute(
+                delete(ArchivedGame).where(ArchivedGame.id == game_id)
+            )
+            await self.db.commit()
+            return result.rowcount > 0
         await self.db.delete(game)
         await self.db.commit()
         return True
@@ -89,6 +299,9 @@ class GameService:
         user_id: int,
         difficulty: str = "medium",
         digit_types: Optional[List[str]] = None,
+        cancel: Optional[asyncio.Event] = None,
+        progress: Optional[Callable[..., None]] = None,
+        budget: Optional[float] = None,
     ):
         # Get user or create dummy
         result = await self.db.execute(select(User).where(User.id == user_id))
@@ -105,23 +318,212 @@ class GameService:
             await self.db.refresh(dummy_user)
             user = dummy_user
 
-        board_state = generate_puzzle(difficulty)
+        start = time.monotonic()
+        puzzle, path = await self._obtain_puzzle(difficulty, cancel, progress, budget)
+        if progress:
+            progress("saving", generation_path=path)
 
         db_game = SudokuGameModel(
-            board_state=board_state,
+            board_state=puzzle.board,
             digit_types=json.dumps(digit_types) if digit_types else None,
             player1_id=user_id,
-            difficulty=difficulty,
+            difficulty=puzzle.difficulty,
+            puzzle_id=puzzle.id,
         )
-        self.db.add(db_game)
-        await self.db.commit()
+        try:
+            self.db.add(db_game)
+            await apply_stats(self.db, self._played_deltas(db_game))
+            await self.db.commit()
+        except Exception:
+            if path == "queued":
+                # End this transaction first, SQLite allows a single writer
+                await self.db.rollback()
+                await puzzle_queue.release(difficulty, [db_game.puzzle_id])
+            raise
         await self.db.refresh(db_game)
+
+        # Reported alongside the game, not stored
+        db_game.generation_path = path
+        db_game.generation_seconds = round(time.monotonic() - start, 3)
         return db_game
 
+    async def _obtain_puzzle(
+        self,
+        difficulty: str,
+        cancel: Optional[asyncio.Event] = None,
+        progress: Optional[Callable[..., None]] = None,
+        budget: Optional[float] = None,
+    ) -> Tuple[PuzzleModel, str]:
+        # Take a pregenerated puzzle, else generate within the budget, else
+        # reuse a stored puzzle of the same difficulty, else generate with a
+        # cheaper recipe. `progress` is called with each stage entered.
+        # `budget` defaults to GENERATION_BUDGET_SECONDS.
+        progress = progress or (lambda stage, **details: None)
+        if puzzle_queue:
+            progress("queue", difficulty=difficulty)
+            puzzle_id = await puzzle_queue.claim(difficulty)
+            if puzzle_id:
+                metrics.inc("generation.queued")
+                return await self.db.get(PuzzleModel, puzzle_id), "queued"
+
+        def on_try(stage: str, difficulty: str, seconds: float):
+            # A progress event as each try of the child starts
+            return lambda attempt, tries: progress(
+                stage,
+                difficulty=difficulty,
+                attempt=attempt,
+                max_tries=tries,
+                budget_seconds=round(seconds, 3),
+            )
+
+        # One budget for the whole request, the requested recipe gets its
+        # share and the fallback what is left
+        if budget is None:
+            budget = settings.GENERATION_BUDGET_SECONDS
+        deadline = time.monotonic() + budget
+        first = budget * settings.GENERATION_FIRST_ATTEMPT_SHARE
+        try:
+            board = await generate_in_subprocess(
+                difficulty, first, cancel, on_try("generating", difficulty, first)
+            )
+            path = "generated"
+        except GenerationCancelled:
+            metrics.inc("generation.cancelled")
+            raise
+        except GenerationBudgetExceeded:
+            metrics.inc("generation.budget_exceeded")
+            result = await self.db.execute(
+                select(PuzzleModel)
+                .where(PuzzleModel.difficulty == difficulty)
+                .order_by(func.random())
+                .limit(1)
+            )
+            stored = result.scalar_one_or_none()
+            if stored:
+                metrics.inc("generation.stored")
+                return stored, "stored"
+
+            remaining = _remaining(deadline, difficulty)
+            difficulty = FALLBACK_DIFFICULTY.get(difficulty, difficulty)
+            board = await generate_in_subprocess(
+                difficulty, remaining, cancel, on_try("fallback", difficulty, remaining)
+            )
+            path = f"fallback:{difficulty}"
+
+        metrics.inc(f"generation.{path}")
+        return await get_or_create_puzzle(self.db, board, difficulty), path
+
+    async def create_games_batch(
+        self,
+        player_ids: List[int],
+        difficulty: str = "medium",
+        digit_types: Optional[List[str]] = None,
+        shared_puzzle: bool = False,
+        cancel: Optional[asyncio.Event] = None,
+    ):
+        if not player_ids:
+            raise ValueError("player_ids must not be empty")
+        if len(player_ids) > settings.MAX_BATCH_GAMES:
+            raise ValueError(f"At most {settings.MAX_BATCH_GAMES} games per batch")
+        result = await self.db.execute(select(User.id).where(User.id.in_(player_ids)))
+        missing = set(player_ids) - set(result.scalars().all())
+        if missing:
+            raise ValueError(f"Players not found: {sorted(missing)}")
+
+        count = 1 if shared_puzzle else len(player_ids)
+        # Drain the queue first, claimed puzzles go back if the batch fails
+        claimed = []
+        while puzzle_queue and len(claimed) < count:
+            puzzle_id = await puzzle_queue.claim(difficulty)
+            if not puzzle_id:
+                break
+            claimed.append(puzzle_id)
+            metrics.inc("generation.queued")
+
+        try:
+            puzzles = await self._obtain_puzzles(difficulty, claimed, count, cancel)
+            if shared_puzzle:
+                puzzles = puzzles * len(player_ids)
+            rows = [
+                {
+                    "board_state": puzzle.board,
+                    "digit_types": json.dumps(digit_types) if digit_types else None,
+                    "player1_id": player_id,
+                    "difficulty": puzzle.difficulty,
+                    "puzzle_id": puzzle.id,
+                }
+                for player_id, puzzle in zip(player_ids, puzzles)
+            ]
+            # One multi-row insert and one commit for the whole batch
+            result = await self.db.scalars(
+                insert(SudokuGameModel).returning(SudokuGameModel), rows
+            )
+            games = result.all()
+            await apply_stats(
+                self.db, (d for game in games for d in self._played_deltas(game))
+            )
+            await self.db.commit()
+        except Exception:
+            if claimed:
+                # End this transaction first, SQLite allows a single writer
+                await self.db.rollback()
+                await puzzle_queue.release(difficulty, claimed)
+            raise
+        return games
+
+    async def _obtain_puzzles(
+        self,
+        difficulty: str,
+        puzzle_ids: List[int],
+        count: int,
+        cancel: Optional[asyncio.Event] = None,
+    ) -> List[PuzzleModel]:
+        # The claimed puzzles, then the rest generated in parallel, one child
+        # process per core
+        cores = asyncio.Semaphore(os.cpu_count() or 1)
+
+        async def generate():
+            async with cores:
+                # Each game's budget starts once it has a core
+                budget = settings.GENERATION_BUDGET_SECONDS
+                deadline = time.monotonic() + budget
+                try:
+                    board = await generate_in_subprocess(
+                        difficulty,
+                        budget * settings.GENERATION_FIRST_ATTEMPT_SHARE,
+                        cancel,
+                    )
+                    return board, difficulty, "generated"
+                except GenerationBudgetExceeded:
+                    metrics.inc("generation.budget_exceeded")
+                    fallback = FALLBACK_DIFFICULTY.get(difficulty, difficulty)
+                    board = await generate_in_subprocess(
+                        fallback, _remaining(deadline, fallback), cancel
+                    )
+                    return board, fallback, f"fallback:{fallback}"
+
+        tasks = [
+            asyncio.create_task(generate()) for _ in range(count - len(puzzle_ids))
+        ]
+        try:
+            generated = await asyncio.gather(*tasks)
+        finally:
+            # One failure fails the batch, stop the remaining children
+            for task in tasks:
+                task.cancel()
+
+        puzzles = [
+            await self.db.get(PuzzleModel, puzzle_id) for puzzle_id in puzzle_ids
+        ]
+        for board, board_difficulty, path in generated:
+            metrics.inc(f"generation.{path}")
+            puzzles.append(await get_or_create_puzzle(self.db, board, board_difficulty))
+        return puzzles
+
     async def make_move(
         self, game_id: int, player_id: int, row: int, col: int, value: int
     ):
-        db_game = await self.get_game(game_id)
+        db_game = await self.get_game(game_id, restore=True)
         if not db_game:
             raise ValueError("Game not found")
 
@@ -140,7 +542,7 @@ class GameService:
                 db_game.mistakes_p1 += 1
             elif db_game.player2_id and player_id == db_game.player2_id:
                 db_game.mistakes_p2 += 1
-            raise ValueError("Invalid move")
+            stats = [stat_delta(player_id, db_game.difficulty, mistakes=1)]
         else:
             # Valid move, record
             if player_id == db_game.player1_id:
@@ -149,17 +551,37 @@ class GameService:
                 db_game.valid_moves_p2 += 1
             db_game.board_state = new_state
             # Game ends if solved, but no status change, derive from board_state
+            stats = [stat_delta(player_id, db_game.difficulty, moves=1)]
+            if is_solved(new_state):
+                stats += solve_deltas(
+                    (db_game.player1_id, db_game.player2_id),
+                    db_game.difficulty,
+                    db_game.created_at,
+                )
 
-        await self.db.commit()
-        await self.db.refresh(db_game)
+        await self._save_move(db_game, stats)
+        if new_state is None:
+            raise ValueError("Invalid move")
         return db_game
 
+    async def _save_move(self, db_game: SudokuGameModel, stats: List[dict]):
+        if not self.cache:
+            await apply_stats(self.db, stats)
+            await self.db.commit()
+            await self.db.refresh(db_game)
+            return
+
+        self.cache.mark_dirty(db_game, stats)
+        # Finished games are written immediately, they won't see another move
+        if settings.GAME_CACHE_WRITE_THROUGH or is_solved(db_game.board_state):
+            await self.cache.flush([db_game.id])
+
     async def get_hint(self, game_id: int):
         db_game = await self.get_game(game_id)
         if not db_game:
             raise ValueError("Game not found")
 
-        hint = get_hint(db_game.board_state)
+        hint = await self._compute(get_hint, db_game.board_state)
         if hint is None:
             raise ValueError("No hint available")
 
@@ -170,7 +592,9 @@ class GameService:
         if not db_game:
             raise ValueError("Game not found")
 
-        solution = get_solution(db_game.board_state)
+        solution = await self._stored_solution(db_game)
+        if solution is None:
+            solution = await self._compute(get_solution, db_game.board_state)
         if solution is None:
             raise ValueError("Game is not solvable")
 
@@ -180,4 +604,15 @@ class GameService:
         db_game = await self.get_game(game_id)
         if not db_game:
             raise ValueError("Game not found")
-        return {"candidates": get_candidates_all(db_game.board_state)}
+        candidates = await self.board_candidates(db_game.board_state)
+        return {"candidates": candidates}
+
+    async def board_candidates(self, board_state: str):
+        return await self._compute(get_candidates_all, board_state)
+
+    async def _compute(self, fn, board_state: str):
+        # Off the event loop, and shared by concurrent requests for the same
+        # board, e.g. both players of a game or a retrying client
+        return await single_flight.do(
+            fn.__name__, board_state, lambda: asyncio.to_thread(fn, board_state)
+        )
@@ -0,0 +1,140 @@
+from typing import List, Optional
+
+ALL_DIGITS = 0x1FF
+
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+UNITS = (
+    [[i for i in range(81) if ROW[i] == n] for n in range(9)]
+    + [[i for i in range(81) if COL[i] == n] for n in range(9)]
+    + [[i for i in range(81) if BOX[i] == n] for n in range(9)]
+)
+
+# Lookup tables indexed by a nine-bit candidate mask (bit d-1 set for digit d)
+POPCOUNT = [bin(mask).count("1") for mask in range(512)]
+DIGITS = [[d + 1 for d in range(9) if mask >> d & 1] for mask in range(512)]
+
+BOARD_CHARS = set("0123456789.")
+
+
+def parse_board(board_str: str) -> List[int]:
+    """Parse an 81 character board, 0 or . for empty cells."""
+    if len(board_str) != 81:
+        raise ValueError("Board must have 81 cells")
+    # int() would also accept non-ASCII digits
+    if not set(board_str) <= BOARD_CHARS:
+        raise ValueError("Board may only contain digits and '.'")
+    return [0 if ch == "." else int(ch) for ch in board_str]
+
+
+class SearchLimitExceeded(ValueError):
+    pass
+
+
+class BitmaskSolver:
+    """Exact-cover search over row, column and box bitmasks.
+
+    Like dancing links it always branches on the most constrained cell or
+    unit, so naked and hidden singles are filled without guessing. `guesses`
+    counts the extra branches taken by the last call and is a cheap
+    difficulty estimate. `max_nodes` bounds the search for untrusted input.
+    """
+
+    def __init__(self, max_nodes: Optional[int] = None):
+        self.max_nodes = max_nodes
+        self.guesses = 0
+        self.nodes = 0
+
+    def solve(self, board_str: str) -> Optional[str]:
+        """Return the first solution found, or None if there is none."""
+        solutions = self._run(board_str, limit=1)
+        return solutions[0] if solutions else None
+
+    def count_solutions(self, board_str: str, limit: int = 2) -> int:
+        """Count solutions, stopping once `limit` have been found."""
+        return len(self._run(board_str, limit))
+
+    def _run(self, board_str: str, limit: int) -> List[str]:
+        self.guesses = 0
+        self.nodes = 0
+        cells = parse_board(board_str)
+        rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+        empties = []
+        for i, value in enumerate(cells):
+            if not value:
+                empties.append(i)
+                continue
+            bit = 1 << (value - 1)
+            if (rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]]) & bit:
+                return []  # Conflicting clues
+            rows[ROW[i]] |= bit
+            cols[COL[i]] |= bit
+            boxes[BOX[i]] |= bit
+
+        solutions = []
+        self._search(cells, rows, cols, boxes, empties, limit, solutions)
+        return solutions
+
+    def _search(self, cells, rows, cols, boxes, empties, limit, solutions) -> bool:
+        self.nodes += 1
+        if self.max_nodes and self.nodes > self.max_nodes:
+            raise SearchLimitExceeded("Board is too hard to verify")
+        if not empties:
+            solutions.append("".join(map(str, cells)))
+            return len(solutions) >= limit
+
+        # Cell constraints: pick the empty cell with the fewest candidates
+        masks = {}
+        best, best_mask, best_count = -1, 0, 10
+        for i in empties:
+            mask = ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]]) & ALL_DIGITS
+            count = POPCOUNT[mask]
+            if count == 0:
+                return False
+            masks[i] = mask
+            if count < best_count:
+                best, best_mask, best_count = i, mask, count
+                if count == 1:
+                    break
+
+        # Unit constraints: a digit with a single place in a row, column or box
+        if best_count > 1:
+            for unit in UNITS:
+                once = twice = placed = 0
+                for i in unit:
+                    if cells[i]:
+                        placed |= 1 << (cells[i] - 1)
+                        continue
+                    twice |= once & masks[i]
+                    once |= masks[i]
+                if once | placed != ALL_DIGITS:
+                    return False  # Some digit has no place left in this unit
+                single = once & ~twice
+                if single:
+                    bit = single & -single
+                    best = next(i for i in unit if not cells[i] and masks[i] & bit)
+                    best_mask, best_count = bit, 1
+                    break
+
+        # Swap-remove the chosen cell, restored below in reverse order
+        index = empties.index(best)
+        empties[index] = empties[-1]
+        empties.pop()
+        r, c, b = ROW[best], COL[best], BOX[best]
+        self.guesses += best_count - 1
+        for value in DIGITS[best_mask]:
+            bit = 1 << (value - 1)
+            cells[best] = value
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+            if self._search(cells, rows, cols, boxes, empties, limit, solutions):
+                return True
+            rows[r] ^= bit
+            cols[c] ^= bit
+            boxes[b] ^= bit
+        cells[best] = 0
+        empties.append(best)
+        empties[index], empties[-1] = empties[-1], empties[index]
+        return False
@@ -1,8 +1,10 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.ndjson import NDJSON_MEDIA_TYPE, dump_lines, iter_lines
 from app.users.schemas import User, UserCreate, UserUpdate
 from app.users.service import UserService
 
@@ -25,6 +27,28 @@ async def create_user(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/export")
+async def export_users(service: UserService = Depends(get_user_service)):
+    async def body():
+        async for rows in service.export_users():
+            yield dump_lines(User.model_validate(dict(row)) for row in rows)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.post("/import")
+async def import_users(
+    request: Request,
+    keep_ids: bool = False,
+    service: UserService = Depends(get_user_service),
+):
+    try:
+        imported = await service.import_users(iter_lines(request.stream()), keep_ids)
+        return {"imported": imported}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/{user_id}", response_model=User)
 async def read_user(user_id: int, service: UserService = Depends(get_user_service)):
     user = await service.get_user(user_id)
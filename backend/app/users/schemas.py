@@ -20,6 +20,14 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+class UserImport(UserBase):
+    # Exports leave out passwords, imported users get none unless supplied
+    id: Optional[int] = None
+    hashed_password: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class UserInDBBase(UserBase):
     id: int
     created_at: datetime
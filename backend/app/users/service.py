@@ -1,8 +1,11 @@
 import random
-from typing import Optional
+from typing import AsyncIterable, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select
+from app.config import settings
+from app.ndjson import import_lines
 from app.users.models import User as UserModel
+from app.users.schemas import UserImport
 
 
 class UserService:
@@ -66,6 +69,31 @@ class UserService:
         result = await self.db.execute(select(UserModel).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def export_users(self):
+        # Server-side cursor, yields one partition of row mappings at a time
+        query = select(UserModel.__table__).order_by(UserModel.id)
+        result = await self.db.stream(
+            query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def import_users(
+        self, lines: AsyncIterable[Tuple[int, bytes]], keep_ids: bool = False
+    ) -> int:
+        return await import_lines(
+            self.db,
+            lines,
+            UserImport,
+            lambda record: record.model_dump(exclude_none=True),
+            self._insert_users,
+            UserModel.__tablename__,
+            keep_ids,
+        )
+
+    async def _insert_users(self, rows: List[dict]):
+        await self.db.execute(insert(UserModel), rows)
+
     async def create_guest(self):
         while True:
             adjective = random.choice(self.adjectives)
@@ -0,0 +1,73 @@
+"""Run every registered solver engine over the corpus.
+
+Reports the median latency of solve, candidates and next_step per engine and
+difficulty, and how often each engine agrees with the reference engine: the
+same solution, the same candidates and a next step consistent with the
+solution.
+
+Run from ./backend: python -m benchmarks.bench_engines [--reference sudoq]
+"""
+
+import argparse
+import statistics
+import time
+
+from app.sudoku.engines import ENGINES
+from benchmarks.corpus import CORPUS
+
+REPEAT = 3
+OPERATIONS = ("solve", "candidates", "next_step")
+
+
+def median_ms(fn, board: str) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(board)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def agrees(operation: str, result, reference, solution: str) -> bool:
+    if operation == "solve":
+        return result == reference
+    if operation == "candidates":
+        # Candidate order within a cell is not significant
+        return [[sorted(cell) for cell in row] for row in result] == [
+            [sorted(cell) for cell in row] for row in reference
+        ]
+    # Engines may pick different cells, any correct placement agrees
+    if result is None:
+        return reference is None
+    _, r, c, value = result
+    return solution[r * 9 + c] == str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reference", default="sudoq")
+    args = parser.parse_args()
+    reference = ENGINES[args.reference]
+
+    header = " ".join(f"{op + ' ms':>13}" for op in OPERATIONS)
+    print(f"{'engine':<10} {'difficulty':<10} {header} {'agree':>7}")
+    for name, engine in ENGINES.items():
+        for difficulty, puzzles in CORPUS.items():
+            timings = {op: [] for op in OPERATIONS}
+            agreed = total = 0
+            for board in puzzles.values():
+                solution = reference.solve(board)
+                for op in OPERATIONS:
+                    fn = getattr(engine, op)
+                    timings[op].append(median_ms(fn, board))
+                    expected = getattr(reference, op)(board)
+                    agreed += agrees(op, fn(board), expected, solution)
+                    total += 1
+            cells = " ".join(
+                f"{statistics.median(timings[op]):>13.2f}" for op in OPERATIONS
+            )
+            print(f"{name:<10} {difficulty:<10} {cells} {agreed:>3}/{total:<3}")
+
+
+if __name__ == "__main__":
+    main()
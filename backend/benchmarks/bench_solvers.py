@@ -0,0 +1,48 @@
+"""Compare BitmaskSolver with sudoq's BacktrackingSolver on the hard corpus.
+
+Run from ./backend: python -m benchmarks.bench_solvers
+"""
+
+import time
+
+from sudoq import Grid
+from sudoq.solvers import BacktrackingSolver
+
+from app.sudoku.solver import BitmaskSolver
+from benchmarks.corpus import HARD
+
+REPEAT = 3
+
+
+def best_of(fn, board: str) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(board)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    bitmask = BitmaskSolver()
+    backtracking = BacktrackingSolver()
+
+    print(f"{'puzzle':<18} {'bitmask ms':>11} {'count ms':>9} {'backtrack ms':>13}")
+    totals = [0.0, 0.0, 0.0]
+    for name, board in HARD.items():
+        solved = bitmask.solve(board)
+        reference = backtracking.solve(Grid.from_string(board)).to_string()
+        assert solved == reference, f"{name}: solvers disagree"
+
+        timings = (
+            best_of(bitmask.solve, board),
+            best_of(bitmask.count_solutions, board),
+            best_of(lambda b: backtracking.solve(Grid.from_string(b)), board),
+        )
+        totals = [t + s for t, s in zip(totals, timings)]
+        print(f"{name:<18} {timings[0]:>11.1f} {timings[1]:>9.1f} {timings[2]:>13.1f}")
+    print(f"{'total':<18} {totals[0]:>11.1f} {totals[1]:>9.1f} {totals[2]:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure import and startup time of the backend in fresh interpreters.
+
+Run from ./backend: python -m benchmarks.bench_startup [--max-startup-ms N]
+
+Reports the median over several runs of
+- import: `import app.main`
+- startup: lifespan startup against an up to date SQLite database
+- warm-up: from startup until lifespan's warm-up task (loading sudoq and
+  starting the generation forkserver) has finished
+and exits non-zero when startup exceeds --max-startup-ms.
+
+Probes run in a temporary directory with their own database, with the
+archiver and the puzzle queue disabled, so no data is touched.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = 5
+
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app, lifespan
+imported = time.perf_counter()
+
+async def main():
+    async with lifespan(app):
+        started = time.perf_counter()
+        await app.state.warm_up_task
+        warmed = time.perf_counter()
+    return started, warmed
+
+started, warmed = asyncio.run(main())
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "startup": (started - start) * 1000,
+    "warm-up": (warmed - started) * 1000,
+}))
+"""
+
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def probe(workdir: str) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND,
+        "ENVIRONMENT": "local",  # SQLite in the working directory
+        "ARCHIVE_ENABLED": "false",
+        "PUZZLE_QUEUE_ENABLED": "false",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=workdir,
+        env=env,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-startup-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        probe(workdir)  # Creates the schema, startup then only checks it
+        runs = [probe(workdir) for _ in range(RUNS)]
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    for key, value in medians.items():
+        print(f"{key:<8} {value:>8.1f} ms")
+
+    if args.max_startup_ms is not None and medians["startup"] > args.max_startup_ms:
+        print(f"startup exceeds {args.max_startup_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the default and compact candidates payloads on the hard corpus.
+
+Run from ./backend: python -m benchmarks.bench_wire_format
+"""
+
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.sudoku.encoding import pack_candidates, unpack_candidates
+from app.sudoku.schemas import CandidatesMap
+from app.sudoku.solver import ALL_DIGITS, BOX, COL, DIGITS, ROW, parse_board
+from benchmarks.corpus import HARD
+
+REPEAT = 2000
+
+
+def candidates(board: str):
+    cells = parse_board(board)
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    for i, value in enumerate(cells):
+        if value:
+            bit = 1 << (value - 1)
+            rows[ROW[i]] |= bit
+            cols[COL[i]] |= bit
+            boxes[BOX[i]] |= bit
+    return [
+        [
+            []
+            if cells[r * 9 + c]
+            else DIGITS[~(rows[r] | cols[c] | boxes[BOX[r * 9 + c]]) & ALL_DIGITS]
+            for c in range(9)
+        ]
+        for r in range(9)
+    ]
+
+
+def default_body(nested) -> bytes:
+    # What FastAPI does for a response_model: validate, encode, dump
+    model = CandidatesMap.model_validate({"candidates": nested})
+    return json.dumps(jsonable_encoder(model)).encode()
+
+
+def compact_body(nested) -> bytes:
+    return json.dumps(
+        {"candidates": pack_candidates(nested)}, separators=(",", ":")
+    ).encode()
+
+
+def per_call_us(fn, arg) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(arg)
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+def main():
+    print(f"{'puzzle':<18} {'bytes':>6} {'compact':>8} {'us':>7} {'compact us':>11}")
+    for name, board in HARD.items():
+        nested = candidates(board)
+        assert unpack_candidates(pack_candidates(nested)) == nested
+        sizes = len(default_body(nested)), len(compact_body(nested))
+        timings = per_call_us(default_body, nested), per_call_us(compact_body, nested)
+        print(
+            f"{name:<18} {sizes[0]:>6} {sizes[1]:>8} "
+            f"{timings[0]:>7.1f} {timings[1]:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Fixed puzzle corpus for solver benchmarks (0 marks an empty cell).
+
+Every puzzle has a unique solution. Easy ones fall to singles alone, medium
+ones need a few guesses from the bitmask solver, hard ones need many.
+"""
+
+EASY = {
+    "euler_01": "003020600900305001001806400008102900700000008006708200002609500800203009005010300",
+    "euler_02": "200080300060070084030500209000105408000000000402706000301007040720040060004010003",
+    "euler_03": "000000907000420180000705026100904000050000040000507009920108000034059000507000000",
+    "euler_04": "030050040008010500460000012070502080000603000040109030250000098001020600080060020",
+}
+
+MEDIUM = {
+    "euler_06": "100920000524010000000000070050008102000000000402700090060000000000030945000071006",
+    "euler_07": "043080250600000000000001094900004070000608000010200003820500000000000005034090710",
+    "norvig_top95_2": "520006000000000701300000000000400800600000050000000000041800000000030020008700000",
+    "norvig_top95_5": "000014000030000200070000000000900030601000000000000080200000104000050600000708000",
+}
+
+HARD = {
+    "ai_escargot": "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+    "inkala_2012": "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "easter_monster": "100000002090400050006000700050903000000070000000850040700000600030009080002000001",
+    "norvig_hard1": "400000805030000000000700000020000060000080400000010000000603070500200000104000000",
+    "coly013": "003000000400080036008000100040060073000900000000002005004070068600000000700600500",
+    "tarek_pearly6000": "120300004350000100004000000005400200600070000000008090003100500000009070000060008",
+}
+
+CORPUS = {"easy": EASY, "medium": MEDIUM, "hard": HARD}